@@ -1,80 +1,127 @@
-from flask import Flask, render_template, request, redirect, session, flash, url_for, jsonify
-from flask_bcrypt import Bcrypt
-from models import db, User, Recharge, Withdrawal, Product, Purchase, Setting
-from datetime import datetime, date, timedelta, timezone
-import os, random
-
-app = Flask(__name__)
-app.secret_key = "mysecretkey123"
-bcrypt = Bcrypt(app)
-
-# ------------------- Database Config -------------------
+from flask import Flask, Blueprint, current_app, render_template, request, redirect, session, flash, url_for, jsonify, stream_with_context
+from sqlalchemy import func, select, literal, union_all
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import joinedload
+from models import db, User, Recharge, Withdrawal, Product, Purchase, Setting, LedgerEntry, BalanceSnapshot, DailyEarning
+from settlement import settle_command
+from init_db import init_db, init_db_command
+from exports import export_command, export_stmt, parse_date, serialize, encode, export_filename, ExportError, FORMATS
+from query_plans import check_query_plans_command
+from engine_profile import init_engine_profile
+from db_routing import read_only, REPLICA_BIND
+from auth import current_user, login_user, login_required
+from instrumentation import init_query_counter, init_metrics, metrics
+from bulk_review import bulk_review
+from ledger import debit, run_with_retry, parse_amount, InsufficientFunds, ledger_cli
+from settings_cache import settings, bump_version
+from catalog import catalog, PUBLIC_MAX_AGE
+from earnings_series import series_cache
+from payouts import utc_today, DAILY_RATE
+from projections import project_payouts
+from events import MAX_STREAMS, STREAM_LIFETIME, broker, purge_events_command, stream as stream_events, turned_away
+from hashing import hash_pool, PoolSaturated
+from idempotency import idempotent, init_idempotency, purge_command
+from rate_limit import limiter, rate_limited, RateLimited
+from datetime import datetime, timezone
+import math, os, random
+
+bp = Blueprint("main", __name__)
+
+# ------------------- App Factory -------------------
 BASE_DIR = os.path.abspath(os.path.dirname(__file__))
 DB_FILE = os.path.join(BASE_DIR, "database.db")
-app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{DB_FILE}"
-app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
-db.init_app(app)
+
+def pool_options(uri):
+    """QueuePool sizing for ``uri``; in-memory SQLite gets a StaticPool that takes none."""
+    url = make_url(uri)
+    if url.get_backend_name() == "sqlite" and (
+            url.database in (None, "", ":memory:") or url.query.get("mode") == "memory"):
+        return {}
+    # One pooled connection per worker thread; set DB_POOL_SIZE to gunicorn --threads
+    return {
+        "pool_size": int(os.environ.get("DB_POOL_SIZE", 5)),
+        "max_overflow": int(os.environ.get("DB_MAX_OVERFLOW", 5)),
+        "pool_timeout": 10,
+    }
+
+def create_app(config=None):
+    """Build the app; opens no database connections (see ``flask init-db``)."""
+    app = Flask(__name__)
+    app.secret_key = "mysecretkey123"
+    app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get("DATABASE_URL", f"sqlite:///{DB_FILE}")
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    # Optional read replica for views marked @read_only, e.g. postgresql://...
+    if os.environ.get("DATABASE_REPLICA_URL"):
+        app.config["SQLALCHEMY_BINDS"] = {REPLICA_BIND: os.environ["DATABASE_REPLICA_URL"]}
+    app.config["SQLITE_PROFILE"] = os.environ.get("SQLITE_PROFILE", "tuned")
+    app.config["BCRYPT_LOG_ROUNDS"] = int(os.environ.get("BCRYPT_LOG_ROUNDS", 12))
+    app.config["HASH_POOL_SIZE"] = int(os.environ.get("HASH_POOL_SIZE", 0)) or None
+    app.config["HASH_QUEUE_DEPTH"] = int(os.environ.get("HASH_QUEUE_DEPTH", 0)) or None
+    app.config["PROFILE_SLOW_MS"] = int(os.environ.get("PROFILE_SLOW_MS", 0)) or None
+    app.config["PROFILE_DIR"] = os.environ.get("PROFILE_DIR", os.path.join(BASE_DIR, "profiles"))
+    app.config["IDEMPOTENCY_TTL"] = int(os.environ.get("IDEMPOTENCY_TTL", 24 * 3600))
+    app.config["IDEMPOTENCY_CACHE_SIZE"] = int(os.environ.get("IDEMPOTENCY_CACHE_SIZE", 10000))
+    # Seconds before an unfinished keyed request counts as dead; keep above gunicorn's timeout
+    app.config["IDEMPOTENCY_LEASE"] = int(os.environ.get("IDEMPOTENCY_LEASE", 60))
+    # Writes per second per user on money routes, with bursts up to RATE_LIMIT_BURST; 0 disables
+    app.config["RATE_LIMIT_PER_SEC"] = float(os.environ.get("RATE_LIMIT_PER_SEC", 1.0))
+    app.config["RATE_LIMIT_BURST"] = int(os.environ.get("RATE_LIMIT_BURST", 5))
+    # Open /events streams per worker process (see gunicorn.conf.py) and their lifetime in seconds
+    app.config["SSE_MAX_STREAMS"] = int(os.environ.get("SSE_MAX_STREAMS", MAX_STREAMS))
+    app.config["SSE_STREAM_LIFETIME"] = int(os.environ.get("SSE_STREAM_LIFETIME", STREAM_LIFETIME))
+    if config:
+        app.config.update(config)
+    app.config.setdefault("SQLALCHEMY_ENGINE_OPTIONS", pool_options(app.config["SQLALCHEMY_DATABASE_URI"]))
+
+    db.init_app(app)
+    init_engine_profile(app)
+    for command in (init_db_command, settle_command, check_query_plans_command, ledger_cli, export_command,
+                    purge_command, purge_events_command):
+        app.cli.add_command(command)
+    init_query_counter(app)
+    init_metrics(app)
+    hash_pool.init_app(app)
+    init_idempotency(app)
+    limiter.init_app(app)
+    app.register_blueprint(bp)
+    return app
+
+# ------------------- Error Handlers -------------------
+@bp.app_errorhandler(PoolSaturated)
+def hashing_busy(e):
+    response = current_app.response_class("Server busy, please retry in a moment.", status=503, mimetype="text/plain")
+    response.headers["Retry-After"] = "1"
+    return response
+
+@bp.app_errorhandler(RateLimited)
+def rate_limit_exceeded(e):
+    response = current_app.response_class("Too many requests, please slow down.", status=429, mimetype="text/plain")
+    response.headers["Retry-After"] = str(math.ceil(e.retry_after))
+    return response
 
 # ------------------- Admin Config -------------------
 ADMIN_USERNAME = "admin"
 ADMIN_PASSWORD = "admin1233"
 MIN_WITHDRAWAL = 50.0
-
-# ------------------- Earnings Logic -------------------
-def credit_purchase(purchase: Purchase):
-    if not purchase or not purchase.active:
-        return 0.0
-    product = purchase.product
-    if not product:
-        return 0.0
-
-    today = datetime.now(timezone.utc).date()
-    if purchase.next_payout_date is None and purchase.purchased_at:
-        purchase.next_payout_date = purchase.purchased_at.date() + timedelta(days=1)
-
-    if purchase.next_payout_date is None or purchase.next_payout_date > today:
-        return 0.0
-
-    days_due = (today - purchase.next_payout_date).days + 1
-    days_to_credit = min(days_due, purchase.remaining_days)
-    if days_to_credit <= 0:
-        return 0.0
-
-    # 20% of product price daily
-    amount = days_to_credit * (product.price * 0.20)
-    user = purchase.user
-    if not user:
-        return 0.0
-
-    user.balance += amount
-    user.earnings += amount
-
-    purchase.remaining_days -= days_to_credit
-    purchase.next_payout_date += timedelta(days=days_to_credit)
-    if purchase.remaining_days <= 0:
-        purchase.active = False
-
-    db.session.commit()
-    return amount
-
-def credit_all_for_user(user: User):
-    total = 0.0
-    if not user:
-        return 0.0
-    purchases = Purchase.query.filter_by(user_id=user.id, active=True).all()
-    for p in purchases:
-        total += credit_purchase(p)
-    return total
+ADMIN_PAGE_SIZE = 50
+STATUSES = ("Pending", "Approved", "Rejected")
+BULK_MAX_IDS = 1000
 
 # ------------------- User Routes -------------------
-@app.route("/")
+@bp.route("/")
+@read_only
 def home():
-    if "user" in session:
-        return redirect(url_for("dashboard"))
-    products = Product.query.order_by(Product.price.asc()).all()
-    return render_template("index.html", products=products)
-
-@app.route("/register", methods=["GET", "POST"])
+    if current_user():
+        return redirect(url_for("main.dashboard"))
+    etag, body = catalog.page("index", lambda products: render_template("index.html", products=products))
+    response = current_app.response_class(body, mimetype="text/html")
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = PUBLIC_MAX_AGE
+    response.vary.add("Cookie")
+    return response.make_conditional(request)
+
+@bp.route("/register", methods=["GET", "POST"])
 def register():
     if request.method == "POST":
         phone_number = request.form.get("phone_number", "").strip()
@@ -88,7 +135,7 @@ def register():
             flash("Phone number already exists.", "error")
             return redirect("/register")
 
-        hashed_password = bcrypt.generate_password_hash(password).decode('utf-8')
+        hashed_password = hash_pool.generate_password_hash(password)
         new_user = User(phone_number=phone_number, password=hashed_password, balance=0.0, earnings=0.0)
         db.session.add(new_user)
         try:
@@ -102,69 +149,82 @@ def register():
 
     return render_template("register.html")
 
-@app.route("/dashboard/chart-data")
+@bp.route("/dashboard/chart-data")
+@read_only
 def dashboard_chart_data():
-    if "user" not in session:
+    user = current_user()
+    if user is None:
         return jsonify({"error": "Unauthorized"}), 401
 
-    user = User.query.filter_by(phone_number=session["user"]).first()
-    if not user:
-        return jsonify({"error": "User not found"}), 404
-
-    purchases = Purchase.query.filter_by(user_id=user.id).all()
-    labels = []
-    earnings = []
-
-    today = date.today()
-    for i in range(7, 0, -1):
-        day = today - timedelta(days=i)
-        daily_total = 0
-        for p in purchases:
-            if p.active and p.next_payout_date <= day:
-                daily_total += p.product.price * 0.20
-        labels.append(day.strftime("%d-%b"))
-        earnings.append(daily_total)
-
-    return jsonify({"labels": labels, "earnings": earnings})
-
-@app.route("/login", methods=["GET", "POST"])
+    etag, body = series_cache.get(user.id, utc_today())
+    if request.if_none_match.contains(etag):
+        response = current_app.response_class(status=304)
+    else:
+        response = current_app.response_class(body, mimetype="application/json")
+    response.set_etag(etag)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+@bp.route("/events")
+def events_stream():
+    user = current_user()
+    if user is None:
+        return jsonify({"error": "Unauthorized"}), 401
+    user_id = user.id
+    db.session.remove()  # don't hold a connection for the life of the stream
+
+    # Each open stream pins a worker thread; past the cap, answer at once
+    # and let EventSource come back later instead of starving other routes.
+    if broker.stream_count() >= current_app.config["SSE_MAX_STREAMS"]:
+        body = turned_away()
+    else:
+        body = stream_with_context(stream_events(user_id, lifetime=current_app.config["SSE_STREAM_LIFETIME"]))
+    response = current_app.response_class(body, mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
+@bp.route("/login", methods=["GET", "POST"])
 def login():
     if request.method == "POST":
         phone_number = request.form.get("phone_number", "").strip()
         password = request.form.get("password", "").strip()
         user = User.query.filter_by(phone_number=phone_number).first()
-        if user and bcrypt.check_password_hash(user.password, password):
-            session["user"] = user.phone_number
+        if user and hash_pool.check_password_hash(user.password, password):
+            login_user(user)
             flash(f"Welcome {user.phone_number}", "success")
             return redirect("/dashboard")
         flash("Invalid credentials", "error")
         return redirect("/login")
     return render_template("login.html")
 
-@app.route("/dashboard")
+def dashboard_history(user_id):
+    """Withdrawals, recharges and the daily payout total in one round trip."""
+    history = union_all(
+        select(literal("withdrawal").label("kind"), Withdrawal.id, Withdrawal.amount, Withdrawal.status)
+        .where(Withdrawal.user_id == user_id),
+        select(literal("recharge"), Recharge.id, Recharge.amount, Recharge.status)
+        .where(Recharge.user_id == user_id),
+        select(literal("daily"), literal(0), func.coalesce(func.sum(Product.price * DAILY_RATE), 0.0), literal(""))
+        .select_from(Purchase)
+        .join(Product, Product.id == Purchase.product_id)
+        .where(Purchase.user_id == user_id, Purchase.active.is_(True)),
+    ).subquery()
+    rows = db.session.execute(select(history).order_by(history.c.kind, history.c.id)).all()
+    withdrawals = [r for r in rows if r.kind == "withdrawal"]
+    recharges = [r for r in rows if r.kind == "recharge"]
+    daily = next(r.amount for r in rows if r.kind == "daily")
+    return withdrawals, recharges, daily
+
+@bp.route("/dashboard")
+@login_required
 def dashboard():
-    if "user" not in session:
-        return redirect("/login")
-
-    user = User.query.filter_by(phone_number=session["user"]).first()
-    if not user:
-        session.clear()
-        flash("User not found. Please login again.", "error")
-        return redirect("/login")
+    user = current_user()
+    withdrawals, recharges, total_daily = dashboard_history(user.id)
 
-    credited = credit_all_for_user(user)
-    if credited > 0:
-        flash(f"K{credited:.2f} credited from purchased products.", "success")
-
-    purchases = Purchase.query.filter_by(user_id=user.id).all()
-    withdrawals = Withdrawal.query.filter_by(user_id=user.id).all()
-    recharges = Recharge.query.filter_by(user_id=user.id).all()
-    total_daily = sum([p.product.price * 0.20 for p in purchases if p.active and p.product])
-
-    recharge_setting = Setting.query.filter_by(key="recharge_number").first()
-    admin_setting = Setting.query.filter_by(key="admin_name").first()
-    recharge_number = recharge_setting.value if recharge_setting else "Not set"
-    admin_name = admin_setting.value if admin_setting else "Admin"
+    recharge_number = settings.get("recharge_number", "Not set")
+    admin_name = settings.get("admin_name", "Admin")
 
     return render_template(
         "dashboard.html",
@@ -172,7 +232,6 @@ def dashboard():
         balance=user.balance,
         earnings=user.earnings,
         daily=total_daily,
-        purchases=purchases,
         withdrawals=withdrawals,
         recharges=recharges,
         user=user,
@@ -180,34 +239,30 @@ def dashboard():
         admin_name=admin_name
     )
 
-@app.route("/logout")
+@bp.route("/logout")
 def logout():
     session.clear()
     flash("Logged out.", "success")
     return redirect("/")
 
-@app.route("/recharge", methods=["GET", "POST"])
+@bp.route("/recharge", methods=["GET", "POST"])
+@rate_limited
+@login_required
+@idempotent
 def recharge():
-    if "user" not in session:
-        return redirect("/login")
-    user = User.query.filter_by(phone_number=session["user"]).first()
-    if not user:
-        session.clear()
-        return redirect("/login")
+    user = current_user()
 
-    recharge_setting = Setting.query.filter_by(key="recharge_number").first()
-    recharge_number = recharge_setting.value if recharge_setting else "Not set"
-    admin_setting = Setting.query.filter_by(key="admin_name").first()
-    admin_name = admin_setting.value if admin_setting else "Admin"
+    recharge_number = settings.get("recharge_number", "Not set")
+    admin_name = settings.get("admin_name", "Admin")
 
     if request.method == "POST":
         wallet = request.form.get("wallet_number", "").strip()
         if wallet:
             user.wallet_number = wallet
         try:
-            amount = float(request.form.get("amount"))
-        except (TypeError, ValueError):
-            flash("Invalid amount.", "error")
+            amount = parse_amount(request.form.get("amount"))
+        except ValueError:
+            flash("Invalid amount; use at most 2 decimal places.", "error")
             return redirect("/recharge")
         if amount <= 0:
             flash("Invalid amount.", "error")
@@ -227,91 +282,98 @@ def recharge():
         wallet_number=user.wallet_number or ""
     )
 
-@app.route("/withdraw", methods=["GET", "POST"])
+@bp.route("/withdraw", methods=["GET", "POST"])
+@rate_limited
+@login_required
+@idempotent
 def withdraw():
-    if "user" not in session:
-        return redirect("/login")
-    user = User.query.filter_by(phone_number=session["user"]).first()
-    if not user:
-        session.clear()
-        return redirect("/login")
+    user = current_user()
 
     if request.method == "POST":
         try:
-            amount = float(request.form.get("amount"))
-        except (TypeError, ValueError):
-            flash("Invalid amount.", "error")
+            amount = parse_amount(request.form.get("amount"))
+        except ValueError:
+            flash("Invalid amount; use at most 2 decimal places.", "error")
             return redirect("/withdraw")
 
         if amount < MIN_WITHDRAWAL:
             flash(f"Minimum withdrawal is K{MIN_WITHDRAWAL:.0f}.", "error")
             return redirect("/withdraw")
-        if amount > user.balance:
+
+        def submit_withdrawal():
+            w = Withdrawal(user_id=user.id, amount=amount, status="Pending")
+            db.session.add(w)
+            db.session.flush()
+            debit(user.id, amount, "withdrawal", ref_id=w.id)
+
+        try:
+            run_with_retry(submit_withdrawal)
+        except InsufficientFunds:
             flash("Insufficient balance.", "error")
             return redirect("/withdraw")
-
-        user.balance -= amount
-        w = Withdrawal(user_id=user.id, amount=amount, status="Pending")
-        db.session.add(w)
-        db.session.commit()
         flash("Withdrawal request submitted; admin will process.", "success")
         return redirect("/dashboard")
 
     withdrawals = Withdrawal.query.filter_by(user_id=user.id).all()
     return render_template("withdraw.html", user=user.phone_number, withdrawals=withdrawals, balance=user.balance)
 
-@app.route("/my_purchases")
+@bp.route("/my_purchases")
+@read_only
+@login_required
 def my_purchases():
-    if "user" not in session:
-        return redirect("/login")
-    user = User.query.filter_by(phone_number=session["user"]).first()
-    if not user:
-        session.clear()
-        return redirect("/login")
-
-    # Ensure earnings are credited before showing purchases
-    credit_all_for_user(user)
+    user = current_user()
 
-    purchases = Purchase.query.filter_by(user_id=user.id).all()
+    purchases = Purchase.query.options(joinedload(Purchase.product)).filter_by(user_id=user.id).all()
     return render_template("my_purchases.html", purchases=purchases, user=user)
 
 # ------------------- Products Routes -------------------
-@app.route("/products")
+@bp.route("/products")
+@read_only
+@login_required
 def products_page():
-    if "user" not in session:
-        return redirect("/login")
-    user = User.query.filter_by(phone_number=session["user"]).first()
-    products = Product.query.order_by(Product.price.asc()).all()
-    return render_template("products.html", products=products, user=user)
+    user = current_user()
+    # Products are sorted by price, so what the user can afford is a prefix
+    affordable = sum(1 for p in catalog.products() if user.balance >= p.price)
+    product_table = catalog.fragment(
+        ("products_table", affordable),
+        lambda products: render_template("products_table.html", products=products, user=user),
+    )
+    return render_template("products.html", product_table=product_table, user=user)
 
-@app.route("/buy_product/<int:id>")
+@bp.route("/buy_product/<int:id>", methods=["POST"])
+@rate_limited
+@login_required
+@idempotent
 def buy_product(id):
-    if "user" not in session:
-        return redirect("/login")
-    user = User.query.filter_by(phone_number=session["user"]).first()
-    product = Product.query.get(id)
+    user = current_user()
+    product = db.session.get(Product, id)
     if not product:
         flash("Product not found.", "error")
         return redirect("/products")
-    if user.balance < product.price:
+
+    # Deduct balance and create purchase
+    def purchase_product():
+        purchase = Purchase(
+            user_id=user.id,
+            product_id=product.id,
+            purchased_at=datetime.now(timezone.utc),
+            remaining_days=product.duration_days,
+            active=True
+        )
+        db.session.add(purchase)
+        db.session.flush()
+        debit(user.id, product.price, "purchase", ref_id=purchase.id)
+
+    try:
+        run_with_retry(purchase_product)
+    except InsufficientFunds:
         flash("Insufficient balance to buy this product.", "error")
         return redirect("/products")
-    # Deduct balance and create purchase
-    user.balance -= product.price
-    purchase = Purchase(
-        user_id=user.id,
-        product_id=product.id,
-        purchased_at=datetime.now(timezone.utc),
-        remaining_days=product.duration_days,
-        active=True
-    )
-    db.session.add(purchase)
-    db.session.commit()
     flash(f"You have successfully purchased {product.name}", "success")
     return redirect("/dashboard")
 
 # ------------------- Admin Routes -------------------
-@app.route("/admin", methods=["GET", "POST"])
+@bp.route("/admin", methods=["GET", "POST"])
 def admin_login():
     if request.method == "POST":
         username = request.form.get("username")
@@ -319,37 +381,79 @@ def admin_login():
         if username == ADMIN_USERNAME and password == ADMIN_PASSWORD:
             session["admin"] = True
             flash("Admin logged in.", "success")
-            return redirect(url_for("admin_dashboard"))
+            return redirect(url_for("main.admin_dashboard"))
         flash("Invalid credentials.", "error")
         return redirect("/admin")
     return render_template("admin_login.html")
 
-@app.route("/admin/dashboard")
+@bp.route("/admin/dashboard")
 def admin_dashboard():
     if "admin" not in session:
         return redirect("/admin")
-    users = User.query.all()
-    withdrawals = Withdrawal.query.all()
-    recharges = Recharge.query.all()
-    products = Product.query.all()
-    purchases = Purchase.query.all()
 
     # Calculate total balance and total earnings across all users
-    total_balance = sum(user.balance for user in users)
-    total_earnings = sum(user.earnings for user in users)
+    totals = db.session.query(
+        func.count(User.id),
+        func.coalesce(func.sum(User.balance), 0.0),
+        func.coalesce(func.sum(User.earnings), 0.0),
+    ).one()
+    pending_withdrawals = db.session.query(
+        func.count(Withdrawal.id), func.coalesce(func.sum(Withdrawal.amount), 0.0)
+    ).filter(Withdrawal.status == "Pending").one()
+    pending_recharges = db.session.query(
+        func.count(Recharge.id), func.coalesce(func.sum(Recharge.amount), 0.0)
+    ).filter(Recharge.status == "Pending").one()
+    active_purchases = Purchase.query.filter_by(active=True).count()
 
     return render_template(
         "admin_dashboard.html",
-        users=users,
-        withdrawals=withdrawals,
-        recharges=recharges,
-        products=products,
-        purchases=purchases,
-        total_balance=total_balance,
-        total_earnings=total_earnings
+        user_count=totals[0],
+        total_balance=totals[1],
+        total_earnings=totals[2],
+        pending_withdrawals=pending_withdrawals,
+        pending_recharges=pending_recharges,
+        active_purchases=active_purchases
     )
 
-@app.route("/admin/update_settings", methods=["GET", "POST"])
+def keyset_page(query, model, after, limit=ADMIN_PAGE_SIZE):
+    if after:
+        query = query.filter(model.id > after)
+    rows = query.order_by(model.id).limit(limit + 1).all()
+    next_after = rows[limit - 1].id if len(rows) > limit else None
+    return rows[:limit], next_after
+
+@bp.route("/admin/users")
+def admin_users():
+    if "admin" not in session:
+        return redirect("/admin")
+    users, next_after = keyset_page(User.query, User, request.args.get("after", type=int))
+    return render_template("admin_users.html", users=users, next_after=next_after)
+
+@bp.route("/admin/withdrawals")
+def admin_withdrawals():
+    if "admin" not in session:
+        return redirect("/admin")
+    status = request.args.get("status", "Pending")
+    query = Withdrawal.query.options(joinedload(Withdrawal.user))
+    if status in STATUSES:
+        query = query.filter(Withdrawal.status == status)
+    withdrawals, next_after = keyset_page(query, Withdrawal, request.args.get("after", type=int))
+    return render_template("admin_withdrawals.html", withdrawals=withdrawals, next_after=next_after,
+                           status=status, statuses=STATUSES)
+
+@bp.route("/admin/recharges")
+def admin_recharges():
+    if "admin" not in session:
+        return redirect("/admin")
+    status = request.args.get("status", "Pending")
+    query = Recharge.query.options(joinedload(Recharge.user))
+    if status in STATUSES:
+        query = query.filter(Recharge.status == status)
+    recharges, next_after = keyset_page(query, Recharge, request.args.get("after", type=int))
+    return render_template("admin_recharges.html", recharges=recharges, next_after=next_after,
+                           status=status, statuses=STATUSES)
+
+@bp.route("/admin/update_settings", methods=["GET", "POST"])
 def update_settings():
     if "admin" not in session:
         return redirect("/admin")
@@ -373,7 +477,9 @@ def update_settings():
             admin_name_setting = Setting(key="admin_name", value=new_name)
             db.session.add(admin_name_setting)
 
+        bump_version()
         db.session.commit()
+        settings.invalidate()
         flash("Settings updated successfully!", "success")
         return redirect("/admin/dashboard")
 
@@ -384,104 +490,161 @@ def update_settings():
                            admin_name=admin_name)
 
 # ------------------- Admin Reset/Delete -------------------
-@app.route("/admin/reset_password/<int:id>", methods=["POST"])
+@bp.route("/admin/reset_password/<int:id>", methods=["POST"])
 def admin_reset_password(id):
     if "admin" not in session:
         return redirect("/admin")
     user = User.query.get(id)
     if not user:
         flash("User not found.", "error")
-        return redirect("/admin/dashboard")
+        return redirect("/admin/users")
     new_password = request.form.get("new_password", "").strip() or "123456"
-    user.password = bcrypt.generate_password_hash(new_password).decode('utf-8')
+    user.password = hash_pool.generate_password_hash(new_password)
     db.session.commit()
     flash(f"Password for {user.phone_number} reset to {new_password}", "success")
-    return redirect("/admin/dashboard")
+    return redirect("/admin/users")
 
-@app.route("/admin/delete_user/<int:id>")
+@bp.route("/admin/delete_user/<int:id>")
 def delete_user(id):
     if "admin" not in session:
         return redirect("/admin")
     user = User.query.get(id)
     if not user:
         flash("User not found.", "error")
-        return redirect("/admin/dashboard")
+        return redirect("/admin/users")
     Purchase.query.filter_by(user_id=id).delete()
     Withdrawal.query.filter_by(user_id=id).delete()
     Recharge.query.filter_by(user_id=id).delete()
+    LedgerEntry.query.filter_by(user_id=id).delete()
+    BalanceSnapshot.query.filter_by(user_id=id).delete()
+    DailyEarning.query.filter_by(user_id=id).delete()
     db.session.delete(user)
     db.session.commit()
     flash("User deleted successfully", "success")
-    return redirect("/admin/dashboard")
+    return redirect("/admin/users")
 
 # ------------------- Admin Approve/Reject -------------------
-@app.route("/admin/approve_recharge/<int:id>")
+@bp.route("/admin/approve_recharge/<int:id>", methods=["POST"])
+@idempotent
 def approve_recharge(id):
     if "admin" not in session:
         return redirect("/admin")
-    r = Recharge.query.get(id)
-    if r and r.status == "Pending":
-        r.status = "Approved"
-        r.user.balance += r.amount
-        db.session.commit()
-        flash(f"Recharge #{r.id} approved.", "success")
-    return redirect("/admin/dashboard")
+    if bulk_review(Recharge, [id], "approve")[id] in STATUSES:
+        flash(f"Recharge #{id} approved.", "success")
+    return redirect("/admin/recharges")
 
-@app.route("/admin/reject_recharge/<int:id>")
+@bp.route("/admin/reject_recharge/<int:id>", methods=["POST"])
+@idempotent
 def reject_recharge(id):
     if "admin" not in session:
         return redirect("/admin")
-    r = Recharge.query.get(id)
-    if r and r.status == "Pending":
-        r.status = "Rejected"
-        db.session.commit()
-        flash(f"Recharge #{r.id} rejected.", "success")
-    return redirect("/admin/dashboard")
+    if bulk_review(Recharge, [id], "reject")[id] in STATUSES:
+        flash(f"Recharge #{id} rejected.", "success")
+    return redirect("/admin/recharges")
 
-@app.route("/admin/approve_withdraw/<int:id>")
+@bp.route("/admin/approve_withdraw/<int:id>", methods=["POST"])
+@idempotent
 def approve_withdraw(id):
     if "admin" not in session:
         return redirect("/admin")
-    w = Withdrawal.query.get(id)
-    if w and w.status == "Pending":
-        w.status = "Approved"
-        db.session.commit()
-        flash(f"Withdrawal #{w.id} approved.", "success")
-    return redirect("/admin/dashboard")
+    if bulk_review(Withdrawal, [id], "approve")[id] in STATUSES:
+        flash(f"Withdrawal #{id} approved.", "success")
+    return redirect("/admin/withdrawals")
 
-@app.route("/admin/reject_withdraw/<int:id>")
+@bp.route("/admin/reject_withdraw/<int:id>", methods=["POST"])
+@idempotent
 def reject_withdraw(id):
     if "admin" not in session:
         return redirect("/admin")
-    w = Withdrawal.query.get(id)
-    if w and w.status == "Pending":
-        w.status = "Rejected"
-        w.user.balance += w.amount
-        db.session.commit()
-        flash(f"Withdrawal #{w.id} rejected and refunded.", "success")
-    return redirect("/admin/dashboard")
+    if bulk_review(Withdrawal, [id], "reject")[id] in STATUSES:
+        flash(f"Withdrawal #{id} rejected and refunded.", "success")
+    return redirect("/admin/withdrawals")
+
+@bp.route("/admin/bulk/<kind>", methods=["POST"])
+@idempotent
+def admin_bulk_review(kind):
+    if "admin" not in session:
+        if request.is_json:
+            return jsonify({"error": "Unauthorized"}), 401
+        return redirect("/admin")
+    model = {"recharges": Recharge, "withdrawals": Withdrawal}.get(kind)
+    if model is None:
+        return jsonify({"error": "Unknown queue"}), 404
+
+    if request.is_json:
+        data = request.get_json(silent=True) or {}
+        action, ids = data.get("action"), data.get("ids") or []
+    else:
+        action, ids = request.form.get("action"), request.form.getlist("ids")
+    try:
+        ids = [int(i) for i in ids]
+    except (TypeError, ValueError):
+        ids = None
+    if action not in ("approve", "reject") or not ids or len(ids) > BULK_MAX_IDS:
+        if request.is_json:
+            return jsonify({"error": f"Provide an action and 1-{BULK_MAX_IDS} integer ids."}), 400
+        flash("Select at least one item.", "error")
+        return redirect(f"/admin/{kind}")
+
+    report = bulk_review(model, ids, action)
+    if request.is_json:
+        return jsonify({"action": action, "results": {str(i): r for i, r in report.items()}})
+    done = sum(1 for r in report.values() if r in STATUSES)
+    flash(f"{done} of {len(report)} {kind} {action}d.", "success")
+    return redirect(f"/admin/{kind}")
+
+@bp.route("/admin/metrics")
+def admin_metrics():
+    if "admin" not in session:
+        return redirect("/admin")
+    return current_app.response_class(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+@bp.route("/admin/export/<kind>")
+@read_only
+def admin_export(kind):
+    if "admin" not in session:
+        return redirect("/admin")
+    fmt = request.args.get("format", "csv")
+    compress = request.args.get("gzip") in ("1", "true", "on")
+    if fmt not in FORMATS:
+        return jsonify({"error": f"Unknown format; choose from {', '.join(FORMATS)}."}), 400
+    try:
+        stmt = export_stmt(
+            kind,
+            parse_date(request.args.get("start")),
+            parse_date(request.args.get("end")),
+            request.args.get("status"),
+        )
+    except ExportError as e:
+        return jsonify({"error": str(e)}), 400
+
+    body = stream_with_context(encode(serialize(stmt, fmt), compress))
+    response = current_app.response_class(body, mimetype="application/gzip" if compress else FORMATS[fmt])
+    response.headers["Content-Disposition"] = f"attachment; filename={export_filename(kind, fmt, compress)}"
+    return response
+
+@bp.route("/admin/projections")
+@read_only
+def admin_projections():
+    if "admin" not in session:
+        return redirect("/admin")
+    days = request.args.get("days", 30, type=int)
+    rate = request.args.get("rate", DAILY_RATE, type=float)
+    if not days or days < 1 or rate is None or rate < 0:
+        return jsonify({"error": "days must be a positive integer and rate a non-negative number."}), 400
+    return jsonify(project_payouts(days=days, rate=rate))
 
 # ------------------- Chart Demo -------------------
-@app.route('/chart-data')
+@bp.route('/chart-data')
 def chart_data():
     now = datetime.now().strftime("%H:%M:%S")
     price = random.randint(50, 150)
     return jsonify(time=now, price=price)
 
-# ------------------- DB Init -------------------
-with app.app_context():
-    db.create_all()
-    if Product.query.count() == 0:
-        starter = Product(name="Starter Package", description="K50 - 20% daily for 20 days", price=50.0, daily_earning=0, duration_days=20)
-        standard = Product(name="Standard Package", description="K150 - 20% daily for 20 days", price=150.0, daily_earning=0, duration_days=20)
-        premium = Product(name="Premium Package", description="K300 - 20% daily for 20 days", price=300.0, daily_earning=0, duration_days=20)
-        db.session.add_all([starter, standard, premium])
-    if not Setting.query.filter_by(key="recharge_number").first():
-        db.session.add(Setting(key="recharge_number", value="0777777777"))
-    if not Setting.query.filter_by(key="admin_name").first():
-        db.session.add(Setting(key="admin_name", value="Admin"))
-    db.session.commit()
-
 # ------------------- Run App -------------------
+app = create_app()  # gunicorn app:app / flask run; no database I/O happens here
+
 if __name__ == "__main__":
+    with app.app_context():
+        init_db()
     app.run(debug=True, host="0.0.0.0", port=5000)
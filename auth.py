@@ -0,0 +1,47 @@
+from functools import wraps
+
+from flask import g, session, redirect, flash
+
+from models import db, User
+from db_routing import on_primary
+
+
+def login_user(user):
+    session.pop("user", None)
+    session["user_id"] = user.id
+
+
+def current_user():
+    """The logged-in User, loaded at most once per request.
+
+    Looked up by primary key (so later ``db.session.get`` calls hit the
+    identity map) and always on the primary, since balances must be fresh.
+    Sessions issued before user ids were stored carry the phone number
+    instead; they are upgraded on first use.
+    """
+    if "current_user" not in g:
+        user = None
+        with on_primary():
+            if "user_id" in session:
+                user = db.session.get(User, session["user_id"])
+            elif "user" in session:
+                user = User.query.filter_by(phone_number=session["user"]).first()
+                if user:
+                    login_user(user)
+        g.current_user = user
+    return g.current_user
+
+
+def login_required(view):
+    """Redirect to /login unless the session belongs to an existing user."""
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if current_user() is None:
+            if "user_id" in session or "user" in session:
+                session.clear()
+                flash("User not found. Please login again.", "error")
+            return redirect("/login")
+        return view(*args, **kwargs)
+
+    return wrapper
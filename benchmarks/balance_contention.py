@@ -0,0 +1,108 @@
+"""Hammer one account from many processes and check no update is lost.
+
+    python benchmarks/balance_contention.py --workers 8 --ops 200
+
+Every worker alternates ledger credits and conditional debits against the
+same user. The final balance must equal the starting balance plus all
+credits minus the debits that succeeded. ``--naive`` runs the old Python
+read-modify-write instead, which is expected to lose updates.
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+
+from models import db, User
+from ledger import credit, debit, run_with_retry, InsufficientFunds
+
+START_BALANCE = 1000.0
+CREDIT = 3.0
+DEBIT = 5.0
+
+
+def make_app(db_file):
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{db_file}"
+    db.init_app(app)
+    return app
+
+
+def worker(db_file, ops, naive, results):
+    app = make_app(db_file)
+    credited = debited = 0
+    with app.app_context():
+        for i in range(ops):
+            if i % 2 == 0:
+                if naive:
+                    user = db.session.get(User, 1)
+                    user.balance += CREDIT
+                    run_with_retry(lambda: None)
+                else:
+                    run_with_retry(lambda: credit(1, CREDIT, "recharge"))
+                credited += 1
+            else:
+                try:
+                    if naive:
+                        user = db.session.get(User, 1)
+                        if user.balance < DEBIT:
+                            raise InsufficientFunds(1, DEBIT)
+                        user.balance -= DEBIT
+                        run_with_retry(lambda: None)
+                    else:
+                        run_with_retry(lambda: debit(1, DEBIT, "withdrawal"))
+                    debited += 1
+                except InsufficientFunds:
+                    pass
+    results.put((credited, debited))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--ops", type=int, default=200, help="operations per worker")
+    parser.add_argument("--naive", action="store_true", help="use in-Python read-modify-write")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_file = os.path.join(tmp, "bench.db")
+        app = make_app(db_file)
+        with app.app_context():
+            db.create_all()
+            db.session.add(User(phone_number="bench", password="x", balance=START_BALANCE, earnings=0.0))
+            db.session.commit()
+
+        results = multiprocessing.Queue()
+        procs = [multiprocessing.Process(target=worker, args=(db_file, args.ops, args.naive, results))
+                 for _ in range(args.workers)]
+        started = time.perf_counter()
+        for p in procs:
+            p.start()
+        totals = [results.get() for _ in procs]
+        for p in procs:
+            p.join()
+        elapsed = time.perf_counter() - started
+
+        credits = sum(c for c, _ in totals)
+        debits = sum(d for _, d in totals)
+        expected = START_BALANCE + credits * CREDIT - debits * DEBIT
+        with app.app_context():
+            actual = db.session.get(User, 1).balance
+
+    ops = credits + debits
+    print(f"mode={'naive' if args.naive else 'ledger'} workers={args.workers} "
+          f"ops={ops} elapsed={elapsed:.2f}s throughput={ops / elapsed:.0f} ops/s")
+    print(f"expected balance={expected:.2f} actual={actual:.2f}")
+    if abs(expected - actual) > 1e-6:
+        print("LOST UPDATES DETECTED")
+        sys.exit(1)
+    print("OK: no lost updates")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Retry storm against /withdraw: idempotent replays and the rate limiter.
+
+    python benchmarks/idempotency.py --retries 200 --threads 8
+
+Seeds one user in a throwaway SQLite database, submits a withdrawal with
+an idempotency key, then replays the same key ``--retries`` times from
+``--threads`` threads through the Flask test client. Reports SQL
+statements (X-Query-Count, TESTING on) and latency for the first request
+and the replays, checks the balance moved once, then fires an unkeyed
+burst to show how many writes the token bucket sheds with 429.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--retries", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--burst", type=int, default=50)
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    from app import app
+    from init_db import init_db
+    from models import db, User, Withdrawal
+    from rate_limit import limiter
+
+    app.config["TESTING"] = True
+    with app.app_context():
+        init_db()
+        db.session.add(User(phone_number="bench", password="x", balance=1e6, earnings=0.0))
+        db.session.commit()
+        user_id = User.query.filter_by(phone_number="bench").one().id
+
+    def client():
+        c = app.test_client()
+        with c.session_transaction() as s:
+            s["user_id"] = user_id
+        return c
+
+    form = {"amount": "100", "idempotency_key": "retry-storm"}
+    limiter.configure(rate=0)  # measure replays alone first
+    started = time.perf_counter()
+    first = client().post("/withdraw", data=form)
+    first_ms = (time.perf_counter() - started) * 1000
+
+    timings, queries, lock = [], [], threading.Lock()
+
+    def replay(n):
+        c = client()
+        for _ in range(n):
+            started = time.perf_counter()
+            r = c.post("/withdraw", data=form)
+            elapsed = time.perf_counter() - started
+            with lock:
+                timings.append(elapsed)
+                queries.append(int(r.headers.get("X-Query-Count", 0)))
+
+    per_thread = max(1, args.retries // args.threads)
+    threads = [threading.Thread(target=replay, args=(per_thread,)) for _ in range(args.threads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    timings.sort()
+
+    with app.app_context():
+        withdrawals = Withdrawal.query.filter_by(user_id=user_id).count()
+        balance = db.session.get(User, user_id).balance
+    print(f"first request   {first_ms:7.2f}ms  queries={first.headers.get('X-Query-Count')}")
+    print(f"{len(timings)} replays    mean {sum(timings) / len(timings) * 1000:7.2f}ms  "
+          f"p95 {timings[int(len(timings) * 0.95) - 1] * 1000:7.2f}ms  max queries={max(queries)}")
+    print(f"withdrawals={withdrawals} balance=K{balance:,.2f}")
+    if withdrawals != 1:
+        raise SystemExit("replays created duplicate withdrawals")
+
+    limiter.configure(rate=app.config["RATE_LIMIT_PER_SEC"], burst=app.config["RATE_LIMIT_BURST"])
+    c = client()
+    codes = [c.post("/withdraw", data={"amount": "60"}).status_code for _ in range(args.burst)]
+    print(f"unkeyed burst of {args.burst}: {codes.count(429)} shed with 429, {len(codes) - codes.count(429)} processed")
+
+
+if __name__ == "__main__":
+    main()
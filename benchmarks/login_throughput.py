@@ -0,0 +1,86 @@
+"""Login throughput against hash pool size and bcrypt cost factor.
+
+    python benchmarks/login_throughput.py --pool-sizes 1,2,4 --rounds 4,8,10 --clients 16
+
+For every (pool size, cost) pair this seeds a user hashed at that cost in a
+throwaway SQLite database and fires ``--logins`` POST /login requests from
+``--clients`` threads through the Flask test client. Hashing runs on the
+process pool, so throughput should scale with pool size until the cores
+run out; requests beyond the queue depth come back as fast 503s.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def run(app, hash_pool, db, User, pool_size, rounds, clients, logins, queue_depth):
+    hash_pool.configure(workers=pool_size, rounds=rounds, queue_depth=queue_depth)
+    phone = f"bench-{pool_size}-{rounds}"
+    with app.app_context():
+        db.session.add(User(phone_number=phone, password=hash_pool.generate_password_hash("secret"),
+                            balance=0.0, earnings=0.0))
+        db.session.commit()
+
+    counts = {"ok": 0, "busy": 0, "other": 0}
+    latencies = []
+    lock = threading.Lock()
+    per_client = logins // clients
+
+    def client():
+        c = app.test_client()
+        for _ in range(per_client):
+            started = time.perf_counter()
+            r = c.post("/login", data={"phone_number": phone, "password": "secret"})
+            elapsed = time.perf_counter() - started
+            key = "ok" if r.status_code == 302 and r.headers["Location"] == "/dashboard" else \
+                "busy" if r.status_code == 503 else "other"
+            with lock:
+                counts[key] += 1
+                latencies.append(elapsed)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - started
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f"pool={pool_size:<3} cost={rounds:<3} logins/s={counts['ok'] / wall:8.1f} "
+          f"ok={counts['ok']:<5} 503={counts['busy']:<5} other={counts['other']:<3} "
+          f"p95={p95 * 1000:7.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pool-sizes", default="1,2,4")
+    parser.add_argument("--rounds", default="4,8,10")
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--logins", type=int, default=160)
+    parser.add_argument("--queue-depth", type=int, default=None,
+                        help="per-process limit (default 4x pool size)")
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    from app import app
+    from init_db import init_db
+    from models import db, User
+    from hashing import hash_pool
+
+    with app.app_context():
+        init_db()
+
+    for rounds in [int(r) for r in args.rounds.split(",")]:
+        for pool_size in [int(p) for p in args.pool_sizes.split(",")]:
+            run(app, hash_pool, db, User, pool_size, rounds, args.clients, args.logins, args.queue_depth)
+    hash_pool.shutdown()
+
+
+if __name__ == "__main__":
+    main()
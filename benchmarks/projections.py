@@ -0,0 +1,105 @@
+"""Payout projection: column arrays + difference array vs a per-row loop.
+
+    python benchmarks/projections.py --purchases 1000000 --days 30
+
+Seeds ``--purchases`` active purchases with spread-out next payout dates
+(some overdue) in a throwaway SQLite database, then times
+projections.project_payouts against the naive approach of loading every
+Purchase with its Product and walking each one day by day. Peak Python
+memory comes from tracemalloc; both must produce the same schedule.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SEED_BATCH = 50_000
+
+
+def naive(Purchase, DAILY_RATE, today, days):
+    from sqlalchemy.orm import joinedload
+
+    totals = [0.0] * days
+    for p in Purchase.query.options(joinedload(Purchase.product)).filter_by(active=True).all():
+        start = p.next_payout_date or p.purchased_at.date() + timedelta(days=1)
+        amount = p.product.price * DAILY_RATE
+        left = p.remaining_days
+        due = (today - start).days + 1
+        if due > 0:
+            caught_up = min(due, left)
+            totals[0] += amount * caught_up
+            left -= caught_up
+            start = today + timedelta(days=1)
+        for i in range(left):
+            offset = (start - today).days + i
+            if offset >= days:
+                break
+            totals[offset] += amount
+    return [round(t, 2) for t in totals]
+
+
+def measure(fn):
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--purchases", type=int, default=200_000)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--skip-naive", action="store_true", help="only time the projection (large --purchases)")
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    from app import app
+    from init_db import init_db
+    from models import db, User, Product, Purchase
+    from payouts import DAILY_RATE, utc_today
+    import projections
+
+    today = utc_today()
+    rng = random.Random(7)
+    with app.app_context():
+        init_db()
+        db.session.add(User(phone_number="bench", password="x", balance=0.0, earnings=0.0))
+        db.session.commit()
+        user_id = User.query.filter_by(phone_number="bench").one().id
+        product_ids = [p.id for p in Product.query.all()]
+        started = time.perf_counter()
+        for offset in range(0, args.purchases, SEED_BATCH):
+            db.session.execute(Purchase.__table__.insert(), [
+                {"user_id": user_id, "product_id": rng.choice(product_ids), "active": True,
+                 "remaining_days": rng.randint(1, 20), "purchased_at": datetime.utcnow(),
+                 "next_payout_date": today + timedelta(days=rng.randint(-3, 20))}
+                for _ in range(min(SEED_BATCH, args.purchases - offset))])
+            db.session.commit()
+        print(f"seeded {args.purchases} purchases in {time.perf_counter() - started:.1f}s")
+
+        report, elapsed, peak = measure(lambda: projections.project_payouts(args.days, today=today))
+        print(f"{'projection (' + report['engine'] + ')':<22} {elapsed * 1000:9.1f}ms  peak {peak / 2**20:8.1f}MB")
+        if args.skip_naive:
+            return
+        db.session.expunge_all()
+        expected, elapsed, peak = measure(lambda: naive(Purchase, DAILY_RATE, today, args.days))
+        print(f"{'naive per-row loop':<22} {elapsed * 1000:9.1f}ms  peak {peak / 2**20:8.1f}MB")
+
+        got = [d["amount"] for d in report["days"]]
+        mismatched = [i for i, (a, b) in enumerate(zip(got, expected)) if abs(a - b) > 0.05]
+        if mismatched:
+            raise SystemExit(f"schedules differ on days {mismatched[:10]}")
+        print(f"schedules match; next {args.days} days total K{report['horizon_total']:,.2f}")
+
+
+if __name__ == "__main__":
+    main()
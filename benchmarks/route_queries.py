@@ -0,0 +1,82 @@
+"""SQL statements and latency per authenticated route.
+
+    python benchmarks/route_queries.py --history 200 --requests 200
+
+Seeds one user with ``--history`` withdrawals and recharges (and a tenth as
+many purchases) in a throwaway SQLite database, logs in through the session
+cookie, then hits every user route ``--requests`` times through the Flask
+test client. Queries come from the X-Query-Count header the app sets when
+TESTING is on.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+ROUTES = [
+    ("GET", "/dashboard", None),
+    ("GET", "/dashboard/chart-data", None),
+    ("GET", "/recharge", None),
+    ("GET", "/withdraw", None),
+    ("GET", "/my_purchases", None),
+    ("GET", "/products", None),
+    ("POST", "/withdraw", {"amount": "50"}),
+    ("POST", "/buy_product/1", None),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--history", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    os.environ["RATE_LIMIT_PER_SEC"] = "0"  # one user hammers /withdraw
+    from app import app
+    from init_db import init_db
+    from models import db, User, Product, Purchase, Recharge, Withdrawal
+
+    app.config["TESTING"] = True
+    with app.app_context():
+        init_db()
+        db.session.add(User(phone_number="bench", password="x", balance=1e9, earnings=0.0))
+        db.session.commit()
+        user_id = User.query.filter_by(phone_number="bench").one().id
+        product_id = Product.query.first().id
+        db.session.execute(Withdrawal.__table__.insert(), [
+            {"user_id": user_id, "amount": 60.0, "status": "Approved"} for _ in range(args.history)])
+        db.session.execute(Recharge.__table__.insert(), [
+            {"user_id": user_id, "amount": 100.0, "status": "Approved"} for _ in range(args.history)])
+        db.session.execute(Purchase.__table__.insert(), [
+            {"user_id": user_id, "product_id": product_id, "remaining_days": 20, "active": True}
+            for _ in range(max(1, args.history // 10))])
+        db.session.commit()
+
+    client = app.test_client()
+    with client.session_transaction() as s:
+        s["user"] = "bench"  # works with both phone-keyed and id-keyed sessions
+    client.get("/dashboard")
+
+    print(f"{'route':<28} {'queries':>7} {'mean':>9} {'p95':>9}")
+    for method, path, data in ROUTES:
+        timings = []
+        queries = None
+        for _ in range(args.requests):
+            started = time.perf_counter()
+            r = client.open(path, method=method, data=data)
+            timings.append(time.perf_counter() - started)
+            queries = r.headers.get("X-Query-Count")
+            if r.status_code >= 400:
+                raise SystemExit(f"{method} {path} returned {r.status_code}")
+        timings.sort()
+        mean = sum(timings) / len(timings)
+        p95 = timings[int(len(timings) * 0.95) - 1]
+        print(f"{method + ' ' + path:<28} {queries:>7} {mean * 1000:7.2f}ms {p95 * 1000:7.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Mixed read/write throughput with and without the SQLite engine profile.
+
+    python benchmarks/sqlite_profile.py --readers 8 --writers 4 --seconds 10
+
+For each profile ("default": stock rollback journal, "tuned": the PRAGMAs
+from engine_profile.py) a fresh process seeds a throwaway database, then
+``--readers`` threads load /dashboard while ``--writers`` threads POST
+/withdraw through the Flask test client for ``--seconds``. Errors are
+mostly "database is locked" surfacing as 500s once the busy wait runs out.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def child(args):
+    from app import app
+    from init_db import init_db
+    from models import db, User
+
+    with app.app_context():
+        init_db()
+        db.session.execute(User.__table__.insert(), [
+            {"phone_number": f"bench-{i}", "password": "x", "balance": 1e9, "earnings": 0.0}
+            for i in range(args.readers + args.writers)
+        ])
+        db.session.commit()
+
+    stats = {"dashboard": [], "withdraw": []}
+    errors = {"dashboard": 0, "withdraw": 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + args.seconds
+
+    def run(n, kind):
+        c = app.test_client()
+        with c.session_transaction() as s:
+            s["user"] = f"bench-{n}"
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            if kind == "dashboard":
+                r = c.get("/dashboard")
+            else:
+                r = c.post("/withdraw", data={"amount": "50"})
+            elapsed = time.perf_counter() - started
+            r.close()
+            with lock:
+                stats[kind].append(elapsed)
+                if r.status_code >= 400:
+                    errors[kind] += 1
+
+    threads = [threading.Thread(target=run, args=(n, "dashboard")) for n in range(args.readers)]
+    threads += [threading.Thread(target=run, args=(args.readers + n, "withdraw")) for n in range(args.writers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    for kind, values in stats.items():
+        values.sort()
+        p95 = values[int(len(values) * 0.95) - 1] if values else 0.0
+        print(f"  {kind:<10} req/s={len(values) / args.seconds:8.1f} p95={p95 * 1000:7.1f}ms "
+              f"errors={errors[kind]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--profiles", default="default,tuned")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args)
+        return
+    for profile in args.profiles.split(","):
+        print(f"{profile}:", flush=True)
+        env = dict(os.environ, SQLITE_PROFILE=profile, RATE_LIMIT_PER_SEC="0",
+                   DB_POOL_SIZE=str(args.readers + args.writers),
+                   DATABASE_URL=f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}")
+        subprocess.run([sys.executable, os.path.abspath(__file__), "--child",
+                        "--readers", str(args.readers), "--writers", str(args.writers),
+                        "--seconds", str(args.seconds)], env=env, check=True)
+
+
+if __name__ == "__main__":
+    main()
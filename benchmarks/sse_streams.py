@@ -0,0 +1,114 @@
+"""Load test: how many concurrent /events streams one worker can hold.
+
+    python benchmarks/sse_streams.py --streams 200 --rounds 5
+    python benchmarks/sse_streams.py --streams 500 --max-streams 0
+
+Starts the app on a threaded WSGI server (one process, like a gunicorn
+gthread worker) against a throwaway SQLite database, opens N
+authenticated event streams, then publishes events through the broker
+and measures fan-out latency until every held stream has received each
+one. ``--max-streams`` is the per-worker cap (SSE_MAX_STREAMS), by
+default the shipped one; streams past it are turned away with a retry
+hint and counted. 0 lifts the cap to measure raw capacity.
+"""
+import argparse
+import http.client
+import logging
+import os
+import resource
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def open_stream(port, cookie, ready, received, errors, turned_away):
+    try:
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+        conn.request("GET", "/events", headers={"Cookie": f"session={cookie}"})
+        response = conn.getresponse()
+        if response.status != 200:
+            raise RuntimeError(f"HTTP {response.status}")
+        if response.fp.readline().startswith(b"retry:"):  # over the cap; else ": connected"
+            turned_away.append(1)
+            ready.release()
+            return
+        ready.release()
+        while True:
+            line = response.fp.readline()
+            if not line:
+                return
+            if line.startswith(b"event: balance"):
+                received.release()
+    except Exception as exc:  # report and keep the rest of the run going
+        errors.append(exc)
+        ready.release()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--streams", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=5, help="events to publish")
+    parser.add_argument("--max-streams", type=int, default=None,
+                        help="SSE_MAX_STREAMS per worker (default: the shipped cap; 0 = no cap)")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+    threading.stack_size(256 * 1024)
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+
+    from werkzeug.serving import make_server
+    from app import app
+    from init_db import init_db
+    from models import db, User
+    from events import broker, MAX_STREAMS
+
+    cap = MAX_STREAMS if args.max_streams is None else args.max_streams
+    app.config["SSE_MAX_STREAMS"] = cap or args.streams
+
+    with app.app_context():
+        init_db()
+        db.session.add(User(phone_number="sse-bench", password="x", balance=0.0, earnings=0.0))
+        db.session.commit()
+        user_id = User.query.filter_by(phone_number="sse-bench").one().id
+    cookie = app.session_interface.get_signing_serializer(app).dumps({"user_id": user_id})
+
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    ready = threading.Semaphore(0)
+    received = threading.Semaphore(0)
+    errors, turned_away = [], []
+    started = time.perf_counter()
+    for _ in range(args.streams):
+        threading.Thread(target=open_stream, args=(server.server_port, cookie, ready, received, errors, turned_away),
+                         daemon=True).start()
+    for _ in range(args.streams):
+        ready.acquire()
+    connect_time = time.perf_counter() - started
+    held = broker.stream_count()
+
+    latencies = []
+    for i in range(args.rounds):
+        sent = time.perf_counter()
+        broker.publish(user_id, "balance", {"reason": "bench", "balance": i, "earnings": 0})
+        for _ in range(held):
+            received.acquire()
+        latencies.append(time.perf_counter() - sent)
+
+    rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"cap={cap or 'none'} streams requested={args.streams} held={held} "
+          f"turned away={len(turned_away)} failed={len(errors)}")
+    print(f"connect all: {connect_time:.2f}s")
+    print(f"fan-out latency: best={min(latencies) * 1000:.1f}ms worst={max(latencies) * 1000:.1f}ms")
+    print(f"max RSS: {rss_mb:.0f} MB ({rss_mb * 1024 / max(held, 1):.0f} KB per stream)")
+    if errors:
+        print(f"first error: {errors[0]!r}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
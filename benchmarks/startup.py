@@ -0,0 +1,97 @@
+"""Cold start: app import time and gunicorn worker boot time.
+
+    python benchmarks/startup.py --runs 10 --workers 4
+
+Initialises a throwaway SQLite database with ``flask init-db``, then
+measures ``import app`` in ``--runs`` fresh interpreters, and how long a
+gunicorn master takes until all ``--workers`` workers have finished
+loading the app (reported by a post_worker_init hook) and until the first
+request is answered.
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_SNIPPET = "import time; t = time.perf_counter(); import app; print(time.perf_counter() - t)"
+HOOK_CONFIG = """
+import time
+def post_worker_init(worker):
+    with open({path!r}, "a") as f:
+        f.write(f"{{time.time()}}\\n")
+"""
+
+
+def measure_import(env, runs):
+    timings = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", IMPORT_SNIPPET], cwd=ROOT, env=env,
+                             check=True, capture_output=True, text=True).stdout
+        timings.append(float(out.strip().splitlines()[-1]))
+    return sorted(timings)
+
+
+def measure_boot(env, workers, tmp):
+    booted = os.path.join(tmp, f"booted-{time.time_ns()}")
+    config = os.path.join(tmp, "gunicorn_hooks.py")
+    with open(config, "w") as f:
+        f.write(HOOK_CONFIG.format(path=booted))
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+
+    started = time.time()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", config, "-w", str(workers), "-b", f"127.0.0.1:{port}", "app:app"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        first_response = None
+        deadline = started + 60
+        while time.time() < deadline:
+            if first_response is None:
+                try:
+                    urllib.request.urlopen(f"http://127.0.0.1:{port}/login", timeout=1).read()
+                    first_response = time.time() - started
+                except OSError:
+                    pass
+            if os.path.exists(booted):
+                with open(booted) as f:
+                    stamps = [float(line) for line in f if line.strip()]
+                if len(stamps) >= workers and first_response is not None:
+                    return first_response, max(stamps) - started
+            time.sleep(0.01)
+        raise RuntimeError("gunicorn workers did not boot")
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+    subprocess.run([sys.executable, "-m", "flask", "--app", "app", "init-db"], cwd=ROOT, env=env,
+                   check=True, capture_output=True)
+
+    imports = measure_import(env, args.runs)
+    print(f"import app:     min {imports[0] * 1000:7.1f}ms  median {imports[len(imports) // 2] * 1000:7.1f}ms")
+    boots = [measure_boot(env, args.workers, tmp) for _ in range(max(1, args.runs // 2))]
+    first = sorted(b[0] for b in boots)
+    ready = sorted(b[1] for b in boots)
+    print(f"gunicorn -w {args.workers}:  first response median {first[len(first) // 2] * 1000:7.1f}ms  "
+          f"all workers booted median {ready[len(ready) // 2] * 1000:7.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
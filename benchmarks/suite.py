@@ -0,0 +1,307 @@
+"""End-to-end latency suite with stored baselines.
+
+    python benchmarks/suite.py --users 5000 --purchases 20000 --journeys 200
+    python benchmarks/suite.py --target gunicorn --workers 4 --threads 4
+    python benchmarks/suite.py --save-baseline benchmarks/baselines.json
+    python benchmarks/suite.py --database-url postgresql://localhost/bench
+
+Seeds a throwaway SQLite database with ``--users`` / ``--purchases`` /
+``--recharges`` / ``--withdrawals`` rows, then runs ``--journeys`` full
+user journeys from ``--concurrency`` threads: register, login, recharge,
+admin approves, buy a product, dashboard, withdraw, admin approves, admin
+dashboard. The journeys go through the Flask test client, a real gunicorn
+server, or both. Settlement of the seeded purchases is timed last, in
+process, since it replaced per-request ``credit_purchase``.
+``--database-url`` runs everything against an empty database on another
+backend, e.g. a local Postgres, instead of a temporary SQLite file.
+
+Prints p50/p95/p99 and requests/s per endpoint. With ``--compare`` (on by
+default when benchmarks/baselines.json exists) p95 is checked against the
+stored numbers and the run exits 1 on regressions beyond ``--tolerance``.
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+DEFAULT_BASELINES = os.path.join(ROOT, "benchmarks", "baselines.json")
+SEED_CHUNK = 5000
+
+
+# ------------------- Seeding -------------------
+def seed(db, models, hash_pool, users, purchases, recharges, withdrawals):
+    """Bulk-insert synthetic rows; every seeded purchase is due for payout."""
+    User, Product, Purchase, Recharge, Withdrawal = models
+    password = hash_pool.generate_password_hash("secret")
+    yesterday = datetime.utcnow().date() - timedelta(days=1)
+    product_ids = [p.id for p in Product.query.all()]
+    rng = random.Random(42)
+
+    def insert(model, rows):
+        for start in range(0, len(rows), SEED_CHUNK):
+            db.session.execute(model.__table__.insert(), rows[start:start + SEED_CHUNK])
+
+    insert(User, [{"phone_number": f"seed-{i}", "password": password,
+                   "balance": 1000.0, "earnings": 0.0} for i in range(users)])
+    first = db.session.query(db.func.min(User.id)).scalar()
+    insert(Purchase, [{"user_id": first + rng.randrange(users), "product_id": rng.choice(product_ids),
+                       "purchased_at": datetime.utcnow(), "next_payout_date": yesterday,
+                       "remaining_days": 20, "active": True} for _ in range(purchases)])
+    statuses = ("Approved", "Approved", "Rejected", "Pending")
+    insert(Recharge, [{"user_id": first + rng.randrange(users), "amount": 100.0,
+                       "status": rng.choice(statuses)} for _ in range(recharges)])
+    insert(Withdrawal, [{"user_id": first + rng.randrange(users), "amount": 60.0,
+                         "status": rng.choice(statuses)} for _ in range(withdrawals)])
+    db.session.commit()
+
+
+# ------------------- Clients -------------------
+class FlaskClient:
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, data=None):
+        response = self.client.open(path, method=method, data=data)
+        response.close()
+        return response.status_code
+
+
+class HttpClient:
+    """Keep-alive HTTP client that carries the Flask session cookie."""
+
+    def __init__(self, port):
+        self.conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        self.cookie = None
+
+    def request(self, method, path, data=None):
+        headers = {"Cookie": f"session={self.cookie}"} if self.cookie else {}
+        body = None
+        if data is not None:
+            body = "&".join(f"{k}={v}" for k, v in data.items())
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+        self.conn.request(method, path, body=body, headers=headers)
+        response = self.conn.getresponse()
+        response.read()
+        for name, value in response.getheaders():
+            if name.lower() == "set-cookie" and value.startswith("session="):
+                self.cookie = value.split(";", 1)[0].split("=", 1)[1] or None
+        return response.status
+
+
+def start_gunicorn(database_url, workers, threads, rounds):
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    env = dict(os.environ, DATABASE_URL=database_url, BCRYPT_LOG_ROUNDS=str(rounds))
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-w", str(workers), "-k", "gthread",
+         "--threads", str(threads), "-b", f"127.0.0.1:{port}", "app:app"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return proc, port
+        except OSError:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError("gunicorn did not start")
+
+
+# ------------------- Journeys -------------------
+class Recorder:
+    def __init__(self):
+        self.samples = {}
+        self.errors = {}
+        self.lock = threading.Lock()
+
+    def timed(self, client, name, method, path, data=None, expect=(200, 302)):
+        started = time.perf_counter()
+        status = client.request(method, path, data)
+        elapsed = time.perf_counter() - started
+        with self.lock:
+            self.samples.setdefault(name, []).append(elapsed)
+            if status not in expect:
+                self.errors[name] = self.errors.get(name, 0) + 1
+
+
+def latest_id(app, db, model, phone):
+    from models import User
+    with app.app_context():
+        return db.session.query(db.func.max(model.id)).join(User, User.id == model.user_id) \
+            .filter(User.phone_number == phone).scalar()
+
+
+def journey(app, db, rec, user, admin, phone, product_id):
+    from models import Recharge, Withdrawal
+    form = {"phone_number": phone, "password": "secret"}
+    rec.timed(user, "POST /register", "POST", "/register", form)
+    rec.timed(user, "POST /login", "POST", "/login", form)
+    rec.timed(user, "POST /recharge", "POST", "/recharge", {"amount": "500", "idempotency_key": uuid.uuid4().hex})
+    recharge_id = latest_id(app, db, Recharge, phone)
+    rec.timed(admin, "GET /admin/recharges", "GET", "/admin/recharges")
+    rec.timed(admin, "POST /admin/approve_recharge", "POST", f"/admin/approve_recharge/{recharge_id}",
+              {"idempotency_key": uuid.uuid4().hex})
+    rec.timed(user, "POST /buy_product", "POST", f"/buy_product/{product_id}", {"idempotency_key": uuid.uuid4().hex})
+    rec.timed(user, "GET /dashboard", "GET", "/dashboard")
+    rec.timed(user, "POST /withdraw", "POST", "/withdraw", {"amount": "100", "idempotency_key": uuid.uuid4().hex})
+    withdrawal_id = latest_id(app, db, Withdrawal, phone)
+    rec.timed(admin, "GET /admin/withdrawals", "GET", "/admin/withdrawals")
+    rec.timed(admin, "POST /admin/approve_withdraw", "POST", f"/admin/approve_withdraw/{withdrawal_id}",
+              {"idempotency_key": uuid.uuid4().hex})
+    rec.timed(admin, "GET /admin/dashboard", "GET", "/admin/dashboard")
+
+
+def drive(app, db, make_client, label, journeys, concurrency, product_id):
+    rec = Recorder()
+    per_thread = journeys // concurrency
+
+    def worker(n):
+        admin = make_client()
+        admin.request("POST", "/admin", {"username": "admin", "password": "admin1233"})
+        for i in range(per_thread):
+            journey(app, db, rec, make_client(), admin, f"bench-{label}-{n}-{i}", product_id)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(concurrency)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return summarize(rec, time.perf_counter() - started)
+
+
+# ------------------- Reporting -------------------
+def percentile(sorted_values, pct):
+    index = max(0, int(round(pct / 100.0 * len(sorted_values))) - 1)
+    return sorted_values[index]
+
+
+def summarize(rec, wall):
+    results = {}
+    for name, values in sorted(rec.samples.items()):
+        values.sort()
+        results[name] = {
+            "count": len(values),
+            "errors": rec.errors.get(name, 0),
+            "p50_ms": round(percentile(values, 50) * 1000, 2),
+            "p95_ms": round(percentile(values, 95) * 1000, 2),
+            "p99_ms": round(percentile(values, 99) * 1000, 2),
+            "rps": round(len(values) / wall, 1),
+        }
+    return results
+
+
+def report(target, results, baseline, tolerance):
+    regressions = []
+    print(f"\n[{target}]")
+    print(f"{'endpoint':<30} {'n':>6} {'err':>4} {'p50':>9} {'p95':>9} {'p99':>9} {'req/s':>8}  vs baseline p95")
+    for name, r in results.items():
+        line = (f"{name:<30} {r['count']:>6} {r['errors']:>4} {r['p50_ms']:>7.2f}ms "
+                f"{r['p95_ms']:>7.2f}ms {r['p99_ms']:>7.2f}ms {r['rps']:>8.1f}")
+        base = (baseline or {}).get(target, {}).get(name)
+        if base:
+            change = (r["p95_ms"] - base["p95_ms"]) / base["p95_ms"] if base["p95_ms"] else 0.0
+            line += f"  {change:+7.1%}"
+            if change > tolerance:
+                line += "  REGRESSION"
+                regressions.append(f"{target} {name}")
+        print(line)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--purchases", type=int, default=10000)
+    parser.add_argument("--recharges", type=int, default=5000)
+    parser.add_argument("--withdrawals", type=int, default=5000)
+    parser.add_argument("--database-url", help="empty database to use instead of a temporary SQLite file")
+    parser.add_argument("--journeys", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--target", choices=("client", "gunicorn", "both"), default="client")
+    parser.add_argument("--workers", type=int, default=2, help="gunicorn worker processes")
+    parser.add_argument("--threads", type=int, default=4, help="gunicorn threads per worker")
+    parser.add_argument("--bcrypt-rounds", type=int, default=4,
+                        help="keep low so hashing does not dominate every journey")
+    parser.add_argument("--compare", default=DEFAULT_BASELINES, help="baseline JSON to check against")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed p95 slowdown (0.5 = 50%%)")
+    parser.add_argument("--save-baseline", metavar="PATH", help="write this run's numbers as the baseline")
+    args = parser.parse_args()
+
+    database_url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    os.environ["DATABASE_URL"] = database_url
+    os.environ["BCRYPT_LOG_ROUNDS"] = str(args.bcrypt_rounds)
+    from app import app
+    from init_db import init_db
+    from models import db, User, Product, Purchase, Recharge, Withdrawal
+    from hashing import hash_pool
+    from settlement import settle
+
+    with app.app_context():
+        init_db()
+        started = time.perf_counter()
+        seed(db, (User, Product, Purchase, Recharge, Withdrawal), hash_pool,
+             args.users, args.purchases, args.recharges, args.withdrawals)
+        product_id = Product.query.order_by(Product.price).first().id
+        print(f"Seeded {args.users} users, {args.purchases} purchases, {args.recharges} recharges, "
+              f"{args.withdrawals} withdrawals in {time.perf_counter() - started:.1f}s")
+
+    concurrency = max(1, min(args.concurrency, args.journeys))
+    results = {"seed": {k: getattr(args, k) for k in ("users", "purchases", "recharges", "withdrawals")}}
+    if args.target in ("client", "both"):
+        results["client"] = drive(app, db, lambda: FlaskClient(app), "client",
+                                  args.journeys, concurrency, product_id)
+    if args.target in ("gunicorn", "both"):
+        proc, port = start_gunicorn(database_url, args.workers, args.threads, args.bcrypt_rounds)
+        try:
+            results["gunicorn"] = drive(app, db, lambda: HttpClient(port), "gunicorn",
+                                        args.journeys, concurrency, product_id)
+        finally:
+            proc.terminate()
+            proc.wait()
+
+    with app.app_context():
+        rows, _, seconds = settle(echo=lambda *a, **k: None)
+    results["cli"] = {"settle": {"count": rows, "errors": 0, "p50_ms": round(seconds * 1000, 2),
+                                 "p95_ms": round(seconds * 1000, 2), "p99_ms": round(seconds * 1000, 2),
+                                 "rps": round(rows / seconds, 1) if seconds else 0.0}}
+    hash_pool.shutdown()
+
+    baseline = None
+    if args.compare and os.path.exists(args.compare) and not args.save_baseline:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline.get("seed") != results["seed"]:
+            print(f"note: baseline was seeded with {baseline.get('seed')}; p95 deltas are not like for like")
+
+    regressions = []
+    for target in ("client", "gunicorn", "cli"):
+        if target in results:
+            regressions += report(target, results[target], baseline, args.tolerance)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"\nBaseline written to {args.save_baseline}")
+    if regressions:
+        print(f"\n{len(regressions)} endpoints regressed beyond {args.tolerance:.0%}: " + ", ".join(regressions))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
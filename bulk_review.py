@@ -0,0 +1,53 @@
+from sqlalchemy import select, update
+
+from models import db, Recharge, Withdrawal
+from ledger import apply_credits, run_with_retry
+from events import record_events
+
+# model -> {action: (new status, ledger entry kind if the user is credited)}
+ACTIONS = {
+    Recharge: {"approve": ("Approved", "recharge"), "reject": ("Rejected", None)},
+    Withdrawal: {"approve": ("Approved", None), "reject": ("Rejected", "refund")},
+}
+
+
+def bulk_review(model, ids, action):
+    """Approve or reject every still-Pending row in ``ids`` in one transaction.
+
+    The status flip is a single conditional UPDATE ... RETURNING, so a row
+    another admin already handled is never touched twice. Returns
+    ``{id: result}`` where result is the new status, ``"not found"`` or
+    ``"already <status>"``.
+    """
+    new_status, credit_kind = ACTIONS[model][action]
+    table = model.__table__
+    ids = sorted(set(ids))
+
+    def review():
+        updated = db.session.execute(
+            update(table)
+            .where(table.c.id.in_(ids), table.c.status == "Pending")
+            .values(status=new_status)
+            .returning(table.c.id, table.c.user_id, table.c.amount)
+        ).all()
+
+        if credit_kind:
+            apply_credits([
+                {"user_id": row.user_id, "kind": credit_kind, "amount": row.amount, "ref_id": row.id}
+                for row in updated
+            ])
+
+        kind = model.__tablename__
+        record_events([(row.user_id, kind, {"id": row.id, "status": new_status}) for row in updated])
+
+        report = {row.id: new_status for row in updated}
+        missed = [i for i in ids if i not in report]
+        if missed:
+            current = dict(db.session.execute(
+                select(table.c.id, table.c.status).where(table.c.id.in_(missed))
+            ).all())
+            for i in missed:
+                report[i] = f"already {current[i]}" if i in current else "not found"
+        return report
+
+    return run_with_retry(review)
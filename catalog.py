@@ -0,0 +1,95 @@
+import hashlib
+import threading
+import time
+from collections import namedtuple
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from models import db, Product
+
+CATALOG_TTL = 300  # seconds; bounds staleness in workers that did not see the change
+PUBLIC_MAX_AGE = 60
+
+CatalogProduct = namedtuple(
+    "CatalogProduct", "id name description price daily_earning duration_days"
+)
+
+
+class ProductCatalog:
+    """Products ordered by price, plus HTML fragments rendered from them.
+
+    Fragments are cached per key and dropped together with the product
+    list, either when a Product change commits in this process or when
+    the TTL runs out.
+    """
+
+    def __init__(self, ttl=CATALOG_TTL):
+        self.ttl = ttl
+        self._products = None
+        self._loaded_at = 0.0
+        self._fragments = {}
+        self._lock = threading.Lock()
+
+    def products(self):
+        with self._lock:
+            if self._products is None or time.monotonic() - self._loaded_at > self.ttl:
+                rows = db.session.execute(
+                    select(Product.id, Product.name, Product.description, Product.price,
+                           Product.daily_earning, Product.duration_days)
+                    .order_by(Product.price.asc(), Product.id)
+                ).all()
+                self._products = [CatalogProduct(*row) for row in rows]
+                self._fragments = {}
+                self._loaded_at = time.monotonic()
+            return self._products
+
+    def fragment(self, key, render):
+        """Return ``render(products)`` cached under ``key``."""
+        products = self.products()
+        with self._lock:
+            if key in self._fragments:
+                return self._fragments[key]
+        value = render(products)
+        with self._lock:
+            if self._products is products:
+                self._fragments[key] = value
+        return value
+
+    def page(self, key, render):
+        """Like ``fragment`` for a full page; returns ``(etag, body)``."""
+
+        def render_page(products):
+            body = render(products)
+            return hashlib.sha1(body.encode()).hexdigest(), body
+
+        return self.fragment(key, render_page)
+
+    def invalidate(self):
+        with self._lock:
+            self._products = None
+            self._fragments = {}
+
+
+catalog = ProductCatalog()
+
+
+def _product_changed(mapper, connection, target):
+    session = Session.object_session(target)
+    if session is not None:
+        session.info["catalog_changed"] = True
+
+
+for _name in ("after_insert", "after_update", "after_delete"):
+    event.listen(Product, _name, _product_changed)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_catalog(session):
+    if session.info.pop("catalog_changed", False):
+        catalog.invalidate()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_catalog_change(session):
+    session.info.pop("catalog_changed", None)
@@ -0,0 +1,45 @@
+from contextlib import contextmanager
+from functools import wraps
+
+from flask import g, has_app_context
+from flask_sqlalchemy.session import Session
+
+REPLICA_BIND = "replica"
+
+
+class RoutingSession(Session):
+    """Sends SELECTs to the replica bind inside ``read_only`` views.
+
+    Everything else (flushes, UPDATE/INSERT/DELETE, CLI commands such as
+    settlement) uses the primary. Without a configured replica every query
+    goes to the primary as before.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None and not self._flushing and has_app_context() and g.get("use_replica")
+                and getattr(clause, "is_select", False)):
+            replica = self._db.engines.get(REPLICA_BIND)
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def read_only(view):
+    """Route the view's reads to the replica; it may lag the primary slightly."""
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        g.use_replica = True
+        return view(*args, **kwargs)
+
+    return wrapper
+
+
+@contextmanager
+def on_primary():
+    """Read from the primary inside a ``read_only`` view, e.g. for fresh balances."""
+    previous = g.pop("use_replica", False)
+    try:
+        yield
+    finally:
+        g.use_replica = previous
@@ -0,0 +1,100 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+
+from sqlalchemy import select
+
+from models import db, DailyEarning
+
+SERIES_DAYS = 7
+SERIES_TTL = 60  # seconds; bounds staleness after a settlement in another process
+SERIES_CACHE_SIZE = 10000  # users per worker process
+
+
+def _upsert():
+    table = DailyEarning.__table__
+    # Imported here so that only the active dialect is loaded (postgresql costs ~50ms)
+    if db.session.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    stmt = insert(table)
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.user_id, table.c.day],
+        set_={"amount": table.c.amount + stmt.excluded.amount},
+    )
+
+
+def record_payouts(payouts):
+    """Add each payout's per-day credits to the users' daily series."""
+    per_day = {}
+    for p in payouts:
+        if not p["days"]:
+            continue
+        daily = p["amount"] / p["days"]
+        first_day = p["next_payout_date"] - timedelta(days=p["days"])
+        for i in range(p["days"]):
+            key = (p["user_id"], first_day + timedelta(days=i))
+            per_day[key] = per_day.get(key, 0.0) + daily
+    if per_day:
+        db.session.execute(
+            _upsert(),
+            [{"user_id": uid, "day": day, "amount": amount} for (uid, day), amount in per_day.items()],
+        )
+
+
+def build_series(user_id, today):
+    start = today - timedelta(days=SERIES_DAYS)
+    credited = dict(db.session.execute(
+        select(DailyEarning.day, DailyEarning.amount)
+        .where(DailyEarning.user_id == user_id, DailyEarning.day >= start, DailyEarning.day < today)
+    ).all())
+    days = [today - timedelta(days=i) for i in range(SERIES_DAYS, 0, -1)]
+    return {
+        "labels": [day.strftime("%d-%b") for day in days],
+        "earnings": [credited.get(day, 0) for day in days],
+    }
+
+
+class SeriesCache:
+    """Serialized chart payload and ETag per user, valid for one date.
+
+    A bounded LRU, so a worker holds at most ``maxsize`` users' charts
+    however many users have ever loaded one.
+    """
+
+    def __init__(self, ttl=SERIES_TTL, maxsize=SERIES_CACHE_SIZE):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id, today):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry and entry[0] == today and now - entry[3] <= self.ttl:
+                self._entries.move_to_end(user_id)
+                return entry[1], entry[2]
+        body = json.dumps(build_series(user_id, today))
+        etag = hashlib.sha1(body.encode()).hexdigest()
+        with self._lock:
+            self._entries[user_id] = (today, etag, body, now)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return etag, body
+
+    def invalidate(self, user_ids=None):
+        """Drop the cached series for ``user_ids``, or for everyone."""
+        with self._lock:
+            if user_ids is None:
+                self._entries.clear()
+            for user_id in user_ids or ():
+                self._entries.pop(user_id, None)
+
+
+series_cache = SeriesCache()
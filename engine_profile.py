@@ -0,0 +1,41 @@
+from functools import partial
+
+from sqlalchemy import event
+
+from models import db
+
+# Applied to every new SQLite connection. WAL lets readers run alongside the
+# single writer; NORMAL sync is durable across app crashes in WAL mode and
+# only risks the last commits on power loss.
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": 5000,          # ms to wait for the write lock
+    "mmap_size": 256 * 1024 ** 2,  # bytes of the file read through mmap
+    "cache_size": -64 * 1024,      # negative = KiB of page cache per connection
+}
+
+
+def _apply_pragmas(pragmas, dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
+
+
+def init_engine_profile(app):
+    """Tune SQLite connections unless SQLITE_PROFILE is "default".
+
+    Extra or overriding pragmas can be given as a SQLITE_PRAGMAS dict.
+    Applies to every SQLite bind; other backends are left untouched.
+    """
+    if app.config.get("SQLITE_PROFILE", "tuned") == "default":
+        return
+    pragmas = {**SQLITE_PRAGMAS, **app.config.get("SQLITE_PRAGMAS", {})}
+    with app.app_context():
+        engines = list(db.engines.values())
+    for engine in engines:
+        if engine.dialect.name == "sqlite":
+            event.listen(engine, "connect", partial(_apply_pragmas, pragmas))
@@ -0,0 +1,217 @@
+import json
+import queue
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import delete, func, insert, select
+
+from models import db, User, LedgerEntry, StreamEvent
+
+HEARTBEAT_SECONDS = 15
+SUBSCRIBER_QUEUE_SIZE = 100
+MAX_STREAMS = 8  # per worker; keep below gunicorn --threads so requests still get a thread
+STREAM_LIFETIME = 300  # seconds before a stream closes and EventSource reconnects
+RETRY_MS = 30000  # reconnect delay sent to clients turned away at the cap
+RELAY_INTERVAL = 1.0  # seconds between relay polls while streams are open
+RELAY_LOOKBACK = 5  # polls a late-committing row can trail the tail by
+EVENT_TTL = 24 * 3600  # seconds stream_event rows are kept
+
+
+class Broker:
+    """In-process pub/sub: one bounded queue per open event stream.
+
+    Only streams held by this worker process are reached; a full queue
+    (a stalled client) drops the event rather than blocking publishers.
+    """
+
+    def __init__(self):
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id):
+        q = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add(q)
+        return q
+
+    def unsubscribe(self, user_id, q):
+        with self._lock:
+            subscribers = self._subscribers.get(user_id)
+            if subscribers:
+                subscribers.discard(q)
+                if not subscribers:
+                    del self._subscribers[user_id]
+
+    def user_ids(self):
+        with self._lock:
+            return list(self._subscribers)
+
+    def stream_count(self):
+        with self._lock:
+            return sum(len(s) for s in self._subscribers.values())
+
+    def publish(self, user_id, kind, data):
+        message = f"event: {kind}\ndata: {json.dumps(data)}\n\n"
+        with self._lock:
+            subscribers = list(self._subscribers.get(user_id, ()))
+        for q in subscribers:
+            try:
+                q.put_nowait(message)
+            except queue.Full:
+                pass
+
+
+broker = Broker()
+
+
+def record_events(events):
+    """Write ``(user_id, kind, data)`` events in the current transaction.
+
+    Every worker's relay reads them once committed, so a status change made
+    in one worker reaches streams held by any other; a rollback drops them.
+    """
+    if events:
+        now = datetime.utcnow()
+        db.session.execute(insert(StreamEvent.__table__), [
+            {"user_id": user_id, "kind": kind, "data": json.dumps(data), "created_at": now}
+            for user_id, kind, data in events
+        ])
+
+
+class _Tail:
+    """New rows of one append-only table for a set of users.
+
+    Rows from the last ``lookback`` polls are re-read, so one whose id was
+    allocated before a later row but committed after it still lands, and
+    remembered ids stop it landing twice.
+    """
+
+    def __init__(self, table, lookback):
+        self.table = table
+        self._tails = deque(maxlen=lookback)
+        self._seen = set()
+
+    def reset(self):
+        self._tails.clear()
+        self._seen.clear()
+
+    def read(self, columns, user_ids):
+        table = self.table
+        tail = db.session.execute(select(func.max(table.c.id))).scalar() or 0
+        if not self._tails or tail < self._tails[-1]:  # first poll, or the table was reset
+            self.reset()
+            self._tails.append(tail)
+            return []
+        floor = self._tails[0]
+        self._tails.append(tail)
+        if not user_ids:
+            return []
+        rows = db.session.execute(
+            select(table.c.id, table.c.user_id, *columns)
+            .where(table.c.id > floor, table.c.user_id.in_(user_ids))
+            .order_by(table.c.id)
+        ).all()
+        self._seen = {row_id for row_id in self._seen if row_id > self._tails[0]}
+        fresh = [row for row in rows if row.id not in self._seen]
+        self._seen.update(row.id for row in fresh)
+        return fresh
+
+
+class EventRelay:
+    """Publishes changes made by any process to this worker's streams.
+
+    Balances change in every process that writes the ledger (other workers,
+    ``flask settle``) and statuses in whichever worker served the admin, so
+    one thread per worker polls the ledger and stream_event tails while any
+    stream is open.
+    """
+
+    def __init__(self, interval=RELAY_INTERVAL, lookback=RELAY_LOOKBACK):
+        self.interval = interval
+        self._thread = None
+        self._lock = threading.Lock()
+        self._ledger = _Tail(LedgerEntry.__table__, lookback)
+        self._events = _Tail(StreamEvent.__table__, lookback)
+
+    def ensure_running(self, app):
+        with self._lock:
+            if self._thread is None:
+                self._ledger.reset()
+                self._events.reset()
+                self._thread = threading.Thread(target=self._run, args=(app,), name="event-relay", daemon=True)
+                self._thread.start()
+
+    def _run(self, app):
+        with app.app_context():
+            while True:
+                with self._lock:
+                    if not broker.stream_count():
+                        self._thread = None
+                        return
+                try:
+                    self.poll()
+                except Exception:
+                    app.logger.exception("event relay poll failed")
+                finally:
+                    db.session.remove()
+                time.sleep(self.interval)
+
+    def poll(self):
+        """Publish new status events, then the balance of users with new ledger entries."""
+        watched = broker.user_ids()
+        for row in self._events.read([StreamEvent.kind, StreamEvent.data], watched):
+            broker.publish(row.user_id, row.kind, json.loads(row.data))
+
+        # the latest entry names the change
+        reasons = {row.user_id: row.kind for row in self._ledger.read([LedgerEntry.kind], watched)}
+        if not reasons:
+            return
+        users = db.session.execute(
+            select(User.id, User.balance, User.earnings).where(User.id.in_(reasons))
+        ).all()
+        for user in users:
+            broker.publish(user.id, "balance",
+                           {"reason": reasons[user.id], "balance": user.balance, "earnings": user.earnings})
+
+
+relay = EventRelay()
+
+
+def stream(user_id, heartbeat=HEARTBEAT_SECONDS, lifetime=STREAM_LIFETIME):
+    """Yield server-sent events for ``user_id`` for at most ``lifetime`` seconds.
+
+    Closing the stream hands its thread back to the worker; the browser's
+    EventSource reconnects on its own.
+    """
+    q = broker.subscribe(user_id)
+    relay.ensure_running(current_app._get_current_object())
+    deadline = time.monotonic() + lifetime
+    try:
+        yield ": connected\n\n"
+        while (left := deadline - time.monotonic()) > 0:
+            try:
+                yield q.get(timeout=min(heartbeat, left))
+            except queue.Empty:
+                yield ": ping\n\n"
+    finally:
+        broker.unsubscribe(user_id, q)
+
+
+def turned_away(retry_ms=RETRY_MS):
+    """Body for a stream refused at the cap: reconnect after ``retry_ms``."""
+    return f"retry: {retry_ms}\n: too many streams, retry later\n\n"
+
+
+@click.command("purge-stream-events")
+@with_appcontext
+def purge_events_command():
+    """Delete stream events older than EVENT_TTL; relays only read recent ones."""
+    cutoff = datetime.utcnow() - timedelta(seconds=EVENT_TTL)
+    with db.engine.begin() as conn:
+        deleted = conn.execute(delete(StreamEvent.__table__).where(StreamEvent.created_at < cutoff)).rowcount
+    click.echo(f"Purged {deleted} stream events.")
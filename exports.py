@@ -0,0 +1,153 @@
+import csv
+import io
+import json
+import sys
+import zlib
+from datetime import datetime, timedelta
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import select
+
+from models import db, User, Purchase, Recharge, Withdrawal
+
+EXPORT_CHUNK = 1000
+FORMATS = {"csv": "text/csv", "jsonl": "application/x-ndjson"}
+
+
+class ExportError(ValueError):
+    pass
+
+
+def _review_statuses(model):
+    return {s.lower(): model.status == s for s in ("Pending", "Approved", "Rejected")}
+
+
+# kind -> (columns, date column or None, {status: condition} or None)
+EXPORTS = {
+    "users": (
+        (User.id, User.phone_number, User.balance, User.earnings, User.wallet_number),
+        None,
+        None,
+    ),
+    "purchases": (
+        (Purchase.id, Purchase.user_id, Purchase.product_id, Purchase.purchased_at,
+         Purchase.next_payout_date, Purchase.remaining_days, Purchase.active),
+        Purchase.purchased_at,
+        {"active": Purchase.active.is_(True), "completed": Purchase.active.is_(False)},
+    ),
+    "recharges": (
+        (Recharge.id, Recharge.user_id, Recharge.amount, Recharge.status, Recharge.created_at),
+        Recharge.created_at,
+        _review_statuses(Recharge),
+    ),
+    "withdrawals": (
+        (Withdrawal.id, Withdrawal.user_id, Withdrawal.amount, Withdrawal.status, Withdrawal.created_at),
+        Withdrawal.created_at,
+        _review_statuses(Withdrawal),
+    ),
+}
+
+
+def parse_date(value):
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError:
+        raise ExportError(f"Invalid date {value!r}, expected YYYY-MM-DD.")
+
+
+def export_stmt(kind, start=None, end=None, status=None):
+    """Select ``kind`` rows in id order; ``start``/``end`` are inclusive dates."""
+    if kind not in EXPORTS:
+        raise ExportError(f"Unknown export {kind!r}; choose from {', '.join(EXPORTS)}.")
+    columns, date_column, statuses = EXPORTS[kind]
+    stmt = select(*columns).order_by(columns[0])
+    if start or end:
+        if date_column is None:
+            raise ExportError(f"{kind} cannot be filtered by date.")
+        if start:
+            stmt = stmt.where(date_column >= start)
+        if end:
+            stmt = stmt.where(date_column < end + timedelta(days=1))
+    if status and status.lower() != "all":
+        if not statuses or status.lower() not in statuses:
+            allowed = ", ".join(statuses) if statuses else "none"
+            raise ExportError(f"Invalid status for {kind}; allowed: {allowed}.")
+        stmt = stmt.where(statuses[status.lower()])
+    return stmt
+
+
+def _encode(value):
+    return value.isoformat() if hasattr(value, "isoformat") else value
+
+
+def serialize(stmt, fmt="csv", chunk_size=EXPORT_CHUNK):
+    """Yield the rows of ``stmt`` as text, one piece per fetched chunk.
+
+    Rows come from a server-side cursor (``yield_per``), so memory stays
+    flat however large the table is.
+    """
+    if fmt not in FORMATS:
+        raise ExportError(f"Unknown format {fmt!r}; choose from {', '.join(FORMATS)}.")
+    result = db.session.execute(stmt.execution_options(yield_per=chunk_size))
+    names = list(result.keys())
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if fmt == "csv":
+        writer.writerow(names)
+    for rows in result.partitions():
+        if fmt == "csv":
+            writer.writerows(rows)
+        else:
+            for row in rows:
+                buffer.write(json.dumps(dict(zip(names, map(_encode, row)))) + "\n")
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def encode(chunks, compress=False):
+    """UTF-8 encode text chunks, optionally as a gzip stream."""
+    if not compress:
+        for chunk in chunks:
+            yield chunk.encode("utf-8")
+        return
+    gzip = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31: gzip header and trailer
+    for chunk in chunks:
+        data = gzip.compress(chunk.encode("utf-8"))
+        if data:
+            yield data
+    yield gzip.flush()
+
+
+def export_filename(kind, fmt, compress=False):
+    return f"{kind}-{datetime.utcnow():%Y%m%d}.{fmt}" + (".gz" if compress else "")
+
+
+@click.command("export")
+@click.argument("kind", type=click.Choice(list(EXPORTS)))
+@click.option("--start", help="First day to include (YYYY-MM-DD).")
+@click.option("--end", help="Last day to include (YYYY-MM-DD).")
+@click.option("--status", help="Pending/Approved/Rejected, or active/completed for purchases.")
+@click.option("--format", "fmt", type=click.Choice(list(FORMATS)), default="csv", show_default=True)
+@click.option("--gzip", "compress", is_flag=True, help="Compress the output with gzip.")
+@click.option("--chunk-size", default=EXPORT_CHUNK, show_default=True, help="Rows fetched per round trip.")
+@click.option("--output", "-o", type=click.Path(dir_okay=False), help="File to write (default: stdout).")
+@with_appcontext
+def export_command(kind, start, end, status, fmt, compress, chunk_size, output):
+    """Stream a table as CSV or JSON lines."""
+    try:
+        stmt = export_stmt(kind, parse_date(start), parse_date(end), status)
+    except ExportError as exc:
+        raise click.UsageError(str(exc))
+    out = open(output, "wb") if output else sys.stdout.buffer
+    try:
+        for data in encode(serialize(stmt, fmt, chunk_size), compress):
+            out.write(data)
+    finally:
+        if output:
+            out.close()
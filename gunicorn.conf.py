@@ -0,0 +1,20 @@
+"""gunicorn settings, read automatically by ``gunicorn app:app`` run from this directory.
+
+/events streams hold a thread for as long as they are open, so sync
+workers (one request at a time) would be pinned by a single dashboard.
+gthread workers serve ``threads`` requests each; at most SSE_MAX_STREAMS
+of those may be streams, leaving the rest for ordinary requests.
+"""
+import multiprocessing
+import os
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("GUNICORN_WORKERS", multiprocessing.cpu_count() * 2 + 1))
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS", 16))
+timeout = 30
+graceful_timeout = 10
+
+# Workers inherit these; explicit settings in the environment win
+os.environ.setdefault("SSE_MAX_STREAMS", str(threads // 2))
+os.environ.setdefault("DB_POOL_SIZE", str(threads))
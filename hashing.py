@@ -0,0 +1,111 @@
+import os
+import threading
+from concurrent.futures import BrokenExecutor, TimeoutError as FuturesTimeout
+
+import bcrypt
+
+DEFAULT_ROUNDS = 12
+
+
+class PoolSaturated(Exception):
+    pass
+
+
+def _hash(password, rounds):
+    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds)).decode("utf-8")
+
+
+def _check(pw_hash, password):
+    return bcrypt.checkpw(password.encode("utf-8"), pw_hash.encode("utf-8"))
+
+
+class HashPool:
+    """bcrypt on a bounded process pool so hashing never runs on a request thread.
+
+    At most ``queue_depth`` hashes may be running or waiting per worker
+    process; beyond that ``PoolSaturated`` is raised immediately so the
+    request can be shed with a 503 instead of queueing behind the pool.
+    A hash not done within ``timeout`` seconds is shed the same way, as is
+    one lost to a dead pool child; the broken pool is replaced on next use.
+    """
+
+    def __init__(self, workers=None, rounds=DEFAULT_ROUNDS, queue_depth=None, timeout=10):
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self.configure(workers, rounds, queue_depth, timeout)
+
+    def configure(self, workers=None, rounds=DEFAULT_ROUNDS, queue_depth=None, timeout=10):
+        self.shutdown()
+        self.workers = workers or os.cpu_count() or 1
+        self.rounds = rounds
+        self.queue_depth = queue_depth or self.workers * 4
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(self.queue_depth)
+
+    def init_app(self, app):
+        self.configure(
+            workers=app.config.get("HASH_POOL_SIZE"),
+            rounds=app.config.get("BCRYPT_LOG_ROUNDS", DEFAULT_ROUNDS),
+            queue_depth=app.config.get("HASH_QUEUE_DEPTH"),
+            timeout=app.config.get("HASH_TIMEOUT", 10),
+        )
+
+    def _pool(self):
+        # Created lazily and per process: gunicorn forks workers after import.
+        # Children come from a forkserver, never fork() of a threaded worker
+        # (a lock held by another thread at fork time would stay held).
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                import multiprocessing  # deferred: costs startup time
+                from concurrent.futures import ProcessPoolExecutor
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("forkserver"))
+                self._pid = os.getpid()
+            return self._executor
+
+    def _run(self, fn, *args):
+        slots = self._slots
+        if not slots.acquire(blocking=False):
+            raise PoolSaturated()
+        executor = self._pool()
+        try:
+            future = executor.submit(fn, *args)
+        except BrokenExecutor:
+            slots.release()
+            self._discard(executor)
+            raise PoolSaturated() from None
+        except Exception:
+            slots.release()
+            raise
+        future.add_done_callback(lambda _: slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except FuturesTimeout:
+            future.cancel()  # still queued: drop it; running: its slot frees when it ends
+            raise PoolSaturated() from None
+        except BrokenExecutor:  # BrokenProcessPool: a child was killed (OOM) or crashed
+            self._discard(executor)
+            raise PoolSaturated() from None
+
+    def _discard(self, executor):
+        """Drop a broken executor so the next call starts a fresh pool."""
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def generate_password_hash(self, password):
+        return self._run(_hash, password, self.rounds)
+
+    def check_password_hash(self, pw_hash, password):
+        return self._run(_check, pw_hash, password)
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+
+hash_pool = HashPool()
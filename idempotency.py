@@ -0,0 +1,238 @@
+import json
+import secrets
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from datetime import datetime, timedelta
+from functools import wraps
+
+import click
+from flask import current_app, request, session, flash
+from flask.cli import with_appcontext
+from sqlalchemy import select, insert, update, delete
+from sqlalchemy.exc import IntegrityError
+
+from models import db, IdempotencyKey
+
+IDEMPOTENCY_TTL = 24 * 3600  # seconds a key is remembered
+IDEMPOTENCY_CACHE_SIZE = 10000
+IDEMPOTENCY_WAIT = 5  # seconds a duplicate waits for the first request to finish
+IDEMPOTENCY_LEASE = 60  # seconds before an unfinished claim counts as abandoned; above gunicorn's timeout
+KEY_HEADER = "Idempotency-Key"
+KEY_FIELD = "idempotency_key"
+MAX_KEY_LENGTH = 64
+
+StoredResponse = namedtuple("StoredResponse", "status mimetype location body flashes")
+
+
+class ReplayCache:
+    """Bounded LRU of finished responses, each kept for at most ``ttl`` seconds.
+
+    Per worker process; the idempotency_key table is the shared fallback.
+    """
+
+    def __init__(self, maxsize=IDEMPOTENCY_CACHE_SIZE, ttl=IDEMPOTENCY_TTL, lease=IDEMPOTENCY_LEASE):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.configure(maxsize, ttl, lease)
+
+    def configure(self, maxsize=IDEMPOTENCY_CACHE_SIZE, ttl=IDEMPOTENCY_TTL, lease=IDEMPOTENCY_LEASE):
+        with self._lock:
+            self.maxsize = maxsize
+            self.ttl = ttl
+            self.lease = lease
+            self._entries.clear()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, response = entry
+            if time.monotonic() - stored_at > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return response
+
+    def put(self, key, response):
+        with self._lock:
+            self._entries[key] = (time.monotonic(), response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+
+replays = ReplayCache()
+
+
+def new_key():
+    """Fresh key for a form; templates call it as ``idempotency_key()``."""
+    return secrets.token_urlsafe(16)
+
+
+def init_idempotency(app):
+    replays.configure(
+        app.config.get("IDEMPOTENCY_CACHE_SIZE", IDEMPOTENCY_CACHE_SIZE),
+        app.config.get("IDEMPOTENCY_TTL", IDEMPOTENCY_TTL),
+        app.config.get("IDEMPOTENCY_LEASE", IDEMPOTENCY_LEASE),
+    )
+    app.jinja_env.globals["idempotency_key"] = new_key
+
+
+def _scope():
+    if session.get("user_id"):
+        return f"user:{session['user_id']}"
+    if "admin" in session:
+        return "admin"
+    return None
+
+
+def _where(cache_key):
+    scope, path, key = cache_key
+    table = IdempotencyKey.__table__
+    return (table.c.scope == scope) & (table.c.path == path) & (table.c.key == key)
+
+
+# Bookkeeping runs on its own connection so it never commits (or rolls
+# back) whatever the view left in db.session.
+def _claim(cache_key):
+    """Insert an in-flight row; False if another request already holds the key.
+
+    A row past the TTL is forgotten, and an in-flight row past its lease
+    belongs to a request that died mid-view (e.g. a killed worker), so
+    either is replaced instead of blocking the key.
+    """
+    scope, path, key = cache_key
+    table = IdempotencyKey.__table__
+    now = datetime.utcnow()
+    expired = table.c.created_at < now - timedelta(seconds=replays.ttl)
+    abandoned = table.c.status.is_(None) & (table.c.created_at < now - timedelta(seconds=replays.lease))
+    try:
+        with db.engine.begin() as conn:
+            conn.execute(delete(table).where(_where(cache_key), expired | abandoned))
+            conn.execute(insert(table).values(scope=scope, path=path, key=key, created_at=now))
+        return True
+    except IntegrityError:
+        return False
+
+
+def _load(cache_key):
+    with db.engine.connect() as conn:
+        row = conn.execute(select(IdempotencyKey.__table__).where(_where(cache_key))).first()
+    if row is None or row.status is None:
+        return None
+    return StoredResponse(row.status, row.mimetype, row.location, row.body, json.loads(row.flashes or "[]"))
+
+
+def _wait_for(cache_key):
+    deadline = time.monotonic() + IDEMPOTENCY_WAIT
+    while time.monotonic() < deadline:
+        stored = replays.get(cache_key) or _load(cache_key)
+        if stored is not None:
+            return stored
+        time.sleep(0.05)
+    return None
+
+
+def _store(cache_key, stored):
+    with db.engine.begin() as conn:
+        conn.execute(
+            update(IdempotencyKey.__table__).where(_where(cache_key)).values(
+                status=stored.status, mimetype=stored.mimetype, location=stored.location,
+                body=stored.body, flashes=json.dumps(stored.flashes),
+            )
+        )
+    replays.put(cache_key, stored)
+
+
+def _release(cache_key):
+    with db.engine.begin() as conn:
+        conn.execute(delete(IdempotencyKey.__table__).where(_where(cache_key)))
+
+
+def _request_key():
+    """``(scope, path, key)`` for a keyed write, or None when it is not one."""
+    key = request.headers.get(KEY_HEADER) or request.form.get(KEY_FIELD)
+    scope = _scope()
+    if request.method == "GET" or not key or scope is None or len(key) > MAX_KEY_LENGTH:
+        return None
+    return scope, request.path, key
+
+
+def cached_replay():
+    """The stored response this worker would replay for the request, if any.
+
+    Memory only, so the rate limiter can ask without touching the database.
+    """
+    cache_key = _request_key()
+    return replays.get(cache_key) if cache_key else None
+
+
+def _replay(stored):
+    for category, message in stored.flashes:
+        flash(message, category)
+    response = current_app.response_class(stored.body, status=stored.status, mimetype=stored.mimetype)
+    if stored.location:
+        response.headers["Location"] = stored.location
+    response.headers["Idempotent-Replayed"] = "true"
+    return response
+
+
+def idempotent(view):
+    """Run a keyed write once; repeats of the key get the first response back.
+
+    The key comes from the Idempotency-Key header or an ``idempotency_key``
+    form field and is scoped to the session's user (or admin) and the URL
+    path. Requests without a key, and GETs, run as before. A duplicate that
+    arrives while the first is still running waits for its response.
+    """
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get(KEY_HEADER) or request.form.get(KEY_FIELD)
+        scope = _scope()
+        if request.method == "GET" or not key or scope is None:
+            return view(*args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return current_app.response_class("Idempotency key too long.", status=400, mimetype="text/plain")
+
+        cache_key = (scope, request.path, key)
+        stored = replays.get(cache_key)
+        if stored is None and not _claim(cache_key):
+            stored = _wait_for(cache_key)
+            if stored is None:
+                response = current_app.response_class(
+                    "This request is still being processed.", status=409, mimetype="text/plain")
+                response.headers["Retry-After"] = "1"
+                return response
+        if stored is not None:
+            replays.put(cache_key, stored)
+            return _replay(stored)
+
+        flashed = len(session.get("_flashes", []))
+        try:
+            response = current_app.make_response(view(*args, **kwargs))
+        except Exception:
+            _release(cache_key)
+            raise
+        if response.is_streamed or response.status_code >= 500:
+            _release(cache_key)
+            return response
+        _store(cache_key, StoredResponse(
+            response.status_code, response.mimetype, response.headers.get("Location"),
+            response.get_data(as_text=True), [list(f) for f in session.get("_flashes", [])[flashed:]],
+        ))
+        return response
+
+    return wrapper
+
+
+@click.command("purge-idempotency-keys")
+@with_appcontext
+def purge_command():
+    """Delete remembered idempotency keys older than IDEMPOTENCY_TTL."""
+    cutoff = datetime.utcnow() - timedelta(seconds=replays.ttl)
+    with db.engine.begin() as conn:
+        deleted = conn.execute(delete(IdempotencyKey.__table__).where(IdempotencyKey.created_at < cutoff)).rowcount
+    click.echo(f"Purged {deleted} idempotency keys.")
@@ -0,0 +1,31 @@
+import click
+from flask.cli import with_appcontext
+
+from models import db, Product, Setting
+
+STARTER_PRODUCTS = [
+    dict(name="Starter Package", description="K50 - 20% daily for 20 days", price=50.0, daily_earning=0, duration_days=20),
+    dict(name="Standard Package", description="K150 - 20% daily for 20 days", price=150.0, daily_earning=0, duration_days=20),
+    dict(name="Premium Package", description="K300 - 20% daily for 20 days", price=300.0, daily_earning=0, duration_days=20),
+]
+DEFAULT_SETTINGS = {"recharge_number": "0777777777", "admin_name": "Admin"}
+
+
+def init_db():
+    """Create missing tables and seed products/settings; safe to run repeatedly."""
+    db.create_all()
+    if db.session.query(Product.id).first() is None:
+        db.session.add_all([Product(**p) for p in STARTER_PRODUCTS])
+    existing = set(db.session.scalars(db.select(Setting.key).where(Setting.key.in_(DEFAULT_SETTINGS))))
+    for key, value in DEFAULT_SETTINGS.items():
+        if key not in existing:
+            db.session.add(Setting(key=key, value=value))
+    db.session.commit()
+
+
+@click.command("init-db")
+@with_appcontext
+def init_db_command():
+    """Create the schema and seed starter products and settings."""
+    init_db()
+    click.echo("Database initialised.")
@@ -0,0 +1,295 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+
+from flask import g, request, before_render_template, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+_local = threading.local()
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+        self.elapsed = 0.0
+        self.statements = []
+
+
+def _active_counters():
+    if not hasattr(_local, "counters"):
+        _local.counters = []
+    return _local.counters
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+    for counter in _active_counters():
+        counter.count += 1
+        counter.statements.append(statement)
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _time_query(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_started"].pop()
+    for counter in _active_counters():
+        counter.elapsed += elapsed
+
+
+@contextmanager
+def count_queries():
+    """Count the SQL statements executed by this thread inside the block."""
+    counter = QueryCounter()
+    counters = _active_counters()
+    counters.append(counter)
+    try:
+        yield counter
+    finally:
+        counters.remove(counter)
+
+
+@contextmanager
+def assert_max_queries(limit):
+    """Fail if the block runs more than ``limit`` SQL statements."""
+    with count_queries() as counter:
+        yield counter
+    if counter.count > limit:
+        raise AssertionError(
+            f"{counter.count} queries executed, expected at most {limit}:\n"
+            + "\n".join(counter.statements)
+        )
+
+
+def init_query_counter(app):
+    """Track queries per request; exposed as X-Query-Count when testing."""
+
+    @app.before_request
+    def _start_query_count():
+        g.query_counter = QueryCounter()
+        _active_counters().append(g.query_counter)
+
+    @app.teardown_request
+    def _stop_query_count(exc):
+        counter = g.pop("query_counter", None)
+        if counter in _active_counters():
+            _active_counters().remove(counter)
+
+    @app.after_request
+    def _query_count_header(response):
+        counter = g.get("query_counter")
+        if counter is not None and app.config.get("TESTING"):
+            response.headers["X-Query-Count"] = str(counter.count)
+        return response
+
+
+# ------------------- Metrics -------------------
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+
+class Histogram:
+    """Cumulative Prometheus-style histogram, one series per endpoint."""
+
+    def __init__(self, name, help_text, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, endpoint, value):
+        with self._lock:
+            series = self._series.get(endpoint)
+            if series is None:
+                series = self._series[endpoint] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted(self._series.items())
+            for endpoint, (counts, total, count) in items:
+                for bound, n in zip(self.buckets, counts):
+                    lines.append(f'{self.name}_bucket{{endpoint="{endpoint}",le="{bound}"}} {n}')
+                lines.append(f'{self.name}_bucket{{endpoint="{endpoint}",le="+Inf"}} {count}')
+                lines.append(f'{self.name}_sum{{endpoint="{endpoint}"}} {total}')
+                lines.append(f'{self.name}_count{{endpoint="{endpoint}"}} {count}')
+        return "\n".join(lines)
+
+
+class Metrics:
+    def __init__(self):
+        self.request_seconds = Histogram(
+            "http_request_duration_seconds", "Wall time per request.", DURATION_BUCKETS)
+        self.sql_queries = Histogram(
+            "http_request_sql_queries", "SQL statements per request.", COUNT_BUCKETS)
+        self.sql_seconds = Histogram(
+            "http_request_sql_seconds", "Time spent in SQL per request.", DURATION_BUCKETS)
+        self.render_seconds = Histogram(
+            "http_request_render_seconds", "Template render time per request.", DURATION_BUCKETS)
+        self.response_bytes = Histogram(
+            "http_response_bytes", "Response body bytes sent.", BYTES_BUCKETS)
+
+    def render(self):
+        return "\n".join(h.render() for h in (
+            self.request_seconds, self.sql_queries, self.sql_seconds,
+            self.render_seconds, self.response_bytes,
+        )) + "\n"
+
+
+metrics = Metrics()
+
+
+class _CountingBody:
+    """Wraps a WSGI response iterable; records time and bytes once it closes."""
+
+    def __init__(self, body, environ, started, on_close):
+        self._body = body
+        self._environ = environ
+        self._started = started
+        self._on_close = on_close
+        self.sent = 0
+
+    def __iter__(self):
+        for chunk in self._body:
+            self.sent += len(chunk)
+            yield chunk
+
+    def close(self):
+        try:
+            if hasattr(self._body, "close"):
+                self._body.close()
+        finally:
+            self._on_close(self._environ, time.perf_counter() - self._started, self.sent)
+
+
+class MetricsMiddleware:
+    """WSGI wrapper measuring full wall time and bytes for every request."""
+
+    def __init__(self, wsgi_app, registry, profiler=None):
+        self.wsgi_app = wsgi_app
+        self.registry = registry
+        self.profiler = profiler
+
+    def __call__(self, environ, start_response):
+        started = time.perf_counter()
+        if self.profiler:
+            self.profiler.begin()
+        try:
+            body = self.wsgi_app(environ, start_response)
+        except Exception:
+            self._record(environ, time.perf_counter() - started, 0)
+            raise
+        return _CountingBody(body, environ, started, self._record)
+
+    def _record(self, environ, elapsed, sent):
+        endpoint = environ.get("metrics.endpoint", "unmatched")
+        self.registry.request_seconds.observe(endpoint, elapsed)
+        self.registry.response_bytes.observe(endpoint, sent)
+        if self.profiler:
+            self.profiler.end(endpoint, elapsed)
+
+
+# ------------------- Sampling Profiler -------------------
+class SamplingProfiler:
+    """Samples the stacks of in-flight request threads from one background thread.
+
+    Requests slower than ``threshold`` seconds have their samples appended
+    to ``<directory>/profile-YYYYMMDD.folded`` in collapsed-stack format
+    (one ``frame;frame;frame count`` line per stack), which flamegraph.pl
+    and speedscope read directly.
+    """
+
+    def __init__(self, directory, threshold, interval=0.005):
+        self.directory = directory
+        self.threshold = threshold
+        self.interval = interval
+        self._active = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def begin(self):
+        with self._lock:
+            self._active[threading.get_ident()] = Counter()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+                self._thread.start()
+
+    def end(self, endpoint, elapsed):
+        with self._lock:
+            samples = self._active.pop(threading.get_ident(), None)
+        if samples and elapsed >= self.threshold:
+            self._dump(endpoint, samples)
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            with self._lock:
+                for ident, samples in self._active.items():
+                    frame = frames.get(ident)
+                    if frame is not None:
+                        samples[self._collapse(frame)] += 1
+
+    @staticmethod
+    def _collapse(frame):
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+            frame = frame.f_back
+        return ";".join(reversed(stack))
+
+    def _dump(self, endpoint, samples):
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"profile-{datetime.utcnow():%Y%m%d}.folded")
+        with open(path, "a") as f:
+            for stack, count in samples.items():
+                f.write(f"{endpoint};{stack} {count}\n")
+
+
+def init_metrics(app):
+    """Record per-endpoint timings, SQL, render time and bytes for every request.
+
+    Relies on the request query counter from ``init_query_counter``. Setting
+    PROFILE_SLOW_MS enables the sampling profiler for slower requests.
+    """
+    profiler = None
+    if app.config.get("PROFILE_SLOW_MS"):
+        profiler = SamplingProfiler(
+            app.config.get("PROFILE_DIR", os.path.join(app.instance_path, "profiles")),
+            app.config["PROFILE_SLOW_MS"] / 1000.0,
+            app.config.get("PROFILE_INTERVAL_MS", 5) / 1000.0,
+        )
+    app.wsgi_app = MetricsMiddleware(app.wsgi_app, metrics, profiler)
+
+    @before_render_template.connect_via(app)
+    def _render_started(sender, template, context, **extra):
+        g.render_started = time.perf_counter()
+
+    @template_rendered.connect_via(app)
+    def _render_finished(sender, template, context, **extra):
+        started = g.pop("render_started", None)
+        if started is not None:
+            g.render_seconds = g.get("render_seconds", 0.0) + time.perf_counter() - started
+
+    @app.after_request
+    def _record_request_metrics(response):
+        endpoint = request.endpoint or "unmatched"
+        request.environ["metrics.endpoint"] = endpoint
+        counter = g.get("query_counter")
+        if counter is not None:
+            metrics.sql_queries.observe(endpoint, counter.count)
+            metrics.sql_seconds.observe(endpoint, counter.elapsed)
+        metrics.render_seconds.observe(endpoint, g.get("render_seconds", 0.0))
+        return response
@@ -0,0 +1,272 @@
+import random
+import sys
+import time
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import select, insert, update, bindparam, func
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import aliased
+
+from models import db, User, LedgerEntry, BalanceSnapshot
+
+RETRY_ATTEMPTS = 6
+RETRY_BASE_DELAY = 0.02
+
+
+class InsufficientFunds(Exception):
+    pass
+
+
+def _is_lock_error(exc):
+    message = str(getattr(exc, "orig", exc)).lower()
+    return "locked" in message or "busy" in message
+
+
+def run_with_retry(work, attempts=RETRY_ATTEMPTS, base_delay=RETRY_BASE_DELAY, retry_on=()):
+    """Run ``work()`` and commit, retrying the whole transaction on lock errors.
+
+    ``work`` must only stage changes in ``db.session``; it is called again
+    from scratch after a rollback, so it should not keep state of its own.
+    Exceptions listed in ``retry_on`` are retried the same way.
+    """
+    for attempt in range(attempts):
+        try:
+            result = work()
+            db.session.commit()
+            return result
+        except OperationalError as exc:
+            db.session.rollback()
+            if not _is_lock_error(exc) or attempt == attempts - 1:
+                raise
+            time.sleep(base_delay * (2 ** attempt) * random.uniform(0.5, 1.5))
+        except retry_on:
+            db.session.rollback()
+            if attempt == attempts - 1:
+                raise
+            time.sleep(base_delay * (2 ** attempt) * random.uniform(0.5, 1.5))
+        except Exception:
+            db.session.rollback()
+            raise
+
+
+def to_minor(amount):
+    return int(round(amount * 100))
+
+
+def to_cents(amount):
+    """``amount`` rounded to whole minor units, as balances and entries store it."""
+    return to_minor(amount) / 100
+
+
+def parse_amount(raw):
+    """Parse a user-entered amount; ValueError unless finite with at most 2 decimals."""
+    try:
+        value = Decimal(str(raw).strip())
+    except (InvalidOperation, TypeError):
+        raise ValueError(f"not an amount: {raw!r}")
+    if not value.is_finite() or value.as_tuple().exponent < -2:
+        raise ValueError(f"not an amount in minor units: {raw!r}")
+    return float(value)
+
+
+def _record(entries):
+    if entries:
+        db.session.execute(insert(LedgerEntry.__table__), entries)
+
+
+def apply_credits(credits):
+    """Credit many users at once and append one ledger entry per credit.
+
+    ``credits`` is a list of dicts with ``user_id``, ``kind``, ``amount``
+    and optional ``ref_id`` / ``earnings`` (also count towards earnings).
+    Each amount is rounded to minor units once, and that value moves both
+    the balance and the ledger. Balances move with a single executemany
+    UPDATE aggregated per user.
+    """
+    if not credits:
+        return
+    per_user = {}
+    entries = []
+    for c in credits:
+        amount = to_cents(c["amount"])
+        balance, earned = per_user.get(c["user_id"], (0.0, 0.0))
+        earned_amount = amount if c.get("earnings") else 0.0
+        per_user[c["user_id"]] = (balance + amount, earned + earned_amount)
+        entries.append({
+            "user_id": c["user_id"],
+            "kind": c["kind"],
+            "amount": to_minor(amount),
+            "earnings": to_minor(earned_amount),
+            "ref_id": c.get("ref_id"),
+            "created_at": datetime.utcnow(),
+        })
+
+    users = User.__table__
+    db.session.execute(
+        update(users)
+        .where(users.c.id == bindparam("u_id"))
+        .values(
+            balance=users.c.balance + bindparam("u_amount"),
+            earnings=users.c.earnings + bindparam("u_earned"),
+        ),
+        [{"u_id": uid, "u_amount": amount, "u_earned": earned}
+         for uid, (amount, earned) in per_user.items()],
+    )
+    _record(entries)
+
+
+def credit(user_id, amount, kind, ref_id=None, earnings=False):
+    """Add ``amount`` to a user's balance (and earnings) in one UPDATE."""
+    apply_credits([{"user_id": user_id, "kind": kind, "amount": amount,
+                    "ref_id": ref_id, "earnings": earnings}])
+
+
+def debit(user_id, amount, kind, ref_id=None):
+    """Take ``amount`` from a user's balance only if it covers it.
+
+    Raises InsufficientFunds when the conditional UPDATE matches no row.
+    ``amount`` is rounded to minor units first, like apply_credits.
+    """
+    amount = to_cents(amount)
+    users = User.__table__
+    result = db.session.execute(
+        update(users)
+        .where(users.c.id == user_id, users.c.balance >= amount)
+        .values(balance=users.c.balance - amount)
+    )
+    if result.rowcount != 1:
+        raise InsufficientFunds(user_id, amount)
+    _record([{"user_id": user_id, "kind": kind, "amount": -to_minor(amount), "earnings": 0,
+              "ref_id": ref_id, "created_at": datetime.utcnow()}])
+
+
+# ------------------- Snapshots & Audit -------------------
+def _latest_snapshots():
+    latest = (
+        select(func.max(BalanceSnapshot.id))
+        .where(BalanceSnapshot.user_id == User.id)
+        .correlate(User)
+        .scalar_subquery()
+    )
+    return aliased(BalanceSnapshot), latest
+
+
+def ledger_totals_stmt(user_id=None):
+    """Per-user balance rebuilt from the latest snapshot plus its tail."""
+    snap, latest = _latest_snapshots()
+    stmt = (
+        select(
+            User.id,
+            User.phone_number,
+            User.balance,
+            User.earnings,
+            (func.coalesce(snap.balance, 0) + func.coalesce(func.sum(LedgerEntry.amount), 0)).label("ledger_balance"),
+            (func.coalesce(snap.earnings, 0) + func.coalesce(func.sum(LedgerEntry.earnings), 0)).label("ledger_earnings"),
+            func.coalesce(func.max(LedgerEntry.id), snap.last_entry_id).label("last_entry_id"),
+            func.count(LedgerEntry.id).label("tail"),
+        )
+        .select_from(User)
+        .outerjoin(snap, snap.id == latest)
+        .outerjoin(
+            LedgerEntry,
+            (LedgerEntry.user_id == User.id)
+            & (LedgerEntry.id > func.coalesce(snap.last_entry_id, 0)),
+        )
+        .group_by(User.id, snap.id)
+        .order_by(User.id)
+    )
+    if user_id is not None:
+        stmt = stmt.where(User.id == user_id)
+    return stmt
+
+
+def rebuild_balance(user_id):
+    """Return ``(balance, earnings)`` in minor units from snapshot + tail."""
+    row = db.session.execute(ledger_totals_stmt(user_id)).first()
+    return (row.ledger_balance, row.ledger_earnings) if row else (0, 0)
+
+
+def open_balances():
+    """Record an opening entry for users whose balance predates the ledger."""
+    has_history = select(LedgerEntry.id).where(LedgerEntry.user_id == User.id).exists()
+    rows = db.session.execute(
+        select(User.id, User.balance, User.earnings).where(~has_history)
+    ).all()
+    _record([
+        {"user_id": r.id, "kind": "opening", "amount": to_minor(r.balance or 0.0),
+         "earnings": to_minor(r.earnings or 0.0), "ref_id": None, "created_at": datetime.utcnow()}
+        for r in rows if r.balance or r.earnings
+    ])
+    return len(rows)
+
+
+def take_snapshots(chunk_size=1000):
+    """Snapshot every user with new ledger entries since their last snapshot."""
+    taken = 0
+    after = 0
+    while True:
+        rows = db.session.execute(
+            ledger_totals_stmt().where(User.id > after).limit(chunk_size)
+        ).all()
+        if not rows:
+            return taken
+        after = rows[-1].id
+        batch = [
+            {"user_id": row.id, "last_entry_id": row.last_entry_id,
+             "balance": row.ledger_balance, "earnings": row.ledger_earnings,
+             "taken_at": datetime.utcnow()}
+            for row in rows if row.tail
+        ]
+        if batch:
+            db.session.execute(insert(BalanceSnapshot.__table__), batch)
+            taken += len(batch)
+
+
+def audit(chunk_size=1000):
+    """Yield users whose stored balance disagrees with the ledger."""
+    for row in db.session.execute(
+        ledger_totals_stmt().execution_options(yield_per=chunk_size)
+    ):
+        if (to_minor(row.balance or 0.0) != row.ledger_balance
+                or to_minor(row.earnings or 0.0) != row.ledger_earnings):
+            yield row
+
+
+ledger_cli = AppGroup("ledger", help="Balance ledger maintenance.")
+
+
+@ledger_cli.command("open")
+def open_command():
+    """Record opening entries for balances that predate the ledger."""
+    users = run_with_retry(open_balances)
+    click.echo(f"Checked {users} users without ledger history.")
+
+
+@ledger_cli.command("snapshot")
+@click.option("--chunk-size", default=1000, show_default=True)
+def snapshot_command(chunk_size):
+    """Store a balance snapshot for every user with new entries."""
+    taken = run_with_retry(lambda: take_snapshots(chunk_size))
+    click.echo(f"Took {taken} balance snapshots.")
+
+
+@ledger_cli.command("audit")
+@click.option("--chunk-size", default=1000, show_default=True)
+def audit_command(chunk_size):
+    """Verify every user's balance against snapshot + ledger tail."""
+    mismatches = 0
+    for row in audit(chunk_size):
+        mismatches += 1
+        click.echo(
+            f"user #{row.id} ({row.phone_number}): balance K{row.balance:.2f} vs ledger "
+            f"K{row.ledger_balance / 100:.2f}, earnings K{row.earnings:.2f} vs ledger "
+            f"K{row.ledger_earnings / 100:.2f}",
+            err=True,
+        )
+    if mismatches:
+        click.echo(f"{mismatches} users out of balance.", err=True)
+        sys.exit(1)
+    click.echo("All balances match the ledger.")
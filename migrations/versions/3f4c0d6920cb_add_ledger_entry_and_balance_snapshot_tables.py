@@ -0,0 +1,57 @@
+"""Add ledger_entry and balance_snapshot tables
+
+Revision ID: 3f4c0d6920cb
+Revises: 8ff73fe7ebb9
+Create Date: 2026-10-18 00:17:02.671390
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f4c0d6920cb'
+down_revision = '8ff73fe7ebb9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # db.create_all() already builds the tables on a fresh database; balances
+    # that predate the ledger are recorded by `flask ledger open`
+    op.create_table(
+        'ledger_entry',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('kind', sa.String(length=20), nullable=False),
+        sa.Column('amount', sa.Integer(), nullable=False),
+        sa.Column('earnings', sa.Integer(), nullable=False),
+        sa.Column('ref_id', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        if_not_exists=True,
+    )
+    op.create_index('ix_ledger_entry_user_id_id', 'ledger_entry', ['user_id', 'id'], unique=False,
+                    if_not_exists=True)
+    op.create_table(
+        'balance_snapshot',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('last_entry_id', sa.Integer(), nullable=False),
+        sa.Column('balance', sa.Integer(), nullable=False),
+        sa.Column('earnings', sa.Integer(), nullable=False),
+        sa.Column('taken_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        if_not_exists=True,
+    )
+    op.create_index('ix_balance_snapshot_user_id_id', 'balance_snapshot', ['user_id', 'id'], unique=False,
+                    if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index('ix_balance_snapshot_user_id_id', table_name='balance_snapshot', if_exists=True)
+    op.drop_table('balance_snapshot', if_exists=True)
+    op.drop_index('ix_ledger_entry_user_id_id', table_name='ledger_entry', if_exists=True)
+    op.drop_table('ledger_entry', if_exists=True)
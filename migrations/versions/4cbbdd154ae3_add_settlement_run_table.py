@@ -0,0 +1,37 @@
+"""Add settlement_run table
+
+Revision ID: 4cbbdd154ae3
+Revises: c4d7e2f9a0b3
+Create Date: 2026-10-18 00:12:37.205114
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4cbbdd154ae3'
+down_revision = 'c4d7e2f9a0b3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # db.create_all() already builds the table on a fresh database
+    op.create_table(
+        'settlement_run',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('run_date', sa.Date(), nullable=False),
+        sa.Column('last_purchase_id', sa.Integer(), nullable=False),
+        sa.Column('rows_settled', sa.Integer(), nullable=False),
+        sa.Column('amount_settled', sa.Float(), nullable=False),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('run_date'),
+        if_not_exists=True,
+    )
+
+
+def downgrade():
+    op.drop_table('settlement_run', if_exists=True)
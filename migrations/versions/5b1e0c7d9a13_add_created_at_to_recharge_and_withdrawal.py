@@ -0,0 +1,33 @@
+"""Add created_at to recharge and withdrawal
+
+Revision ID: 5b1e0c7d9a13
+Revises: deca01f82842
+Create Date: 2026-10-17 21:40:12.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b1e0c7d9a13'
+down_revision = 'deca01f82842'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Rows created before this revision keep a NULL timestamp; db.create_all()
+    # already adds the column on a fresh database
+    inspector = sa.inspect(op.get_bind())
+    for table in ('recharge', 'withdrawal'):
+        if 'created_at' in {c['name'] for c in inspector.get_columns(table)}:
+            continue
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.add_column(sa.Column('created_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    for table in ('withdrawal', 'recharge'):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column('created_at')
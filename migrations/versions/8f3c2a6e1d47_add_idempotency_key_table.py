@@ -0,0 +1,41 @@
+"""Add idempotency_key table
+
+Revision ID: 8f3c2a6e1d47
+Revises: 5b1e0c7d9a13
+Create Date: 2026-10-17 23:05:41.902117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8f3c2a6e1d47'
+down_revision = '5b1e0c7d9a13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # db.create_all() already builds the table on a fresh database
+    op.create_table(
+        'idempotency_key',
+        sa.Column('scope', sa.String(length=40), nullable=False),
+        sa.Column('path', sa.String(length=200), nullable=False),
+        sa.Column('key', sa.String(length=64), nullable=False),
+        sa.Column('status', sa.Integer(), nullable=True),
+        sa.Column('mimetype', sa.String(length=100), nullable=True),
+        sa.Column('location', sa.String(length=255), nullable=True),
+        sa.Column('body', sa.Text(), nullable=True),
+        sa.Column('flashes', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('scope', 'path', 'key'),
+        if_not_exists=True,
+    )
+    op.create_index('ix_idempotency_key_created_at', 'idempotency_key', ['created_at'], unique=False,
+                    if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index('ix_idempotency_key_created_at', table_name='idempotency_key', if_exists=True)
+    op.drop_table('idempotency_key', if_exists=True)
@@ -0,0 +1,34 @@
+"""Add daily_earning table
+
+Revision ID: 8ff73fe7ebb9
+Revises: 4cbbdd154ae3
+Create Date: 2026-10-18 00:15:48.930276
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8ff73fe7ebb9'
+down_revision = '4cbbdd154ae3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # db.create_all() already builds the table on a fresh database; days
+    # settled before it existed stay empty in the chart
+    op.create_table(
+        'daily_earning',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('amount', sa.Float(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id', 'day'),
+        if_not_exists=True,
+    )
+
+
+def downgrade():
+    op.drop_table('daily_earning', if_exists=True)
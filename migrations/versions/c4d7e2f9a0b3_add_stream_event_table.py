@@ -0,0 +1,41 @@
+"""Add stream_event table
+
+Revision ID: c4d7e2f9a0b3
+Revises: 8f3c2a6e1d47
+Create Date: 2026-10-17 23:48:20.514377
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4d7e2f9a0b3'
+down_revision = '8f3c2a6e1d47'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # db.create_all() already builds the table on a fresh database
+    op.create_table(
+        'stream_event',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('kind', sa.String(length=20), nullable=False),
+        sa.Column('data', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        if_not_exists=True,
+    )
+    op.create_index('ix_stream_event_user_id_id', 'stream_event', ['user_id', 'id'], unique=False,
+                    if_not_exists=True)
+    op.create_index('ix_stream_event_created_at', 'stream_event', ['created_at'], unique=False,
+                    if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index('ix_stream_event_created_at', table_name='stream_event', if_exists=True)
+    op.drop_index('ix_stream_event_user_id_id', table_name='stream_event', if_exists=True)
+    op.drop_table('stream_event', if_exists=True)
@@ -0,0 +1,36 @@
+"""Add indexes for hot lookups
+
+Revision ID: deca01f82842
+Revises: 
+Create Date: 2026-10-17 20:23:55.888423
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'deca01f82842'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    ('purchase', 'ix_purchase_user_id_active', ['user_id', 'active']),
+    ('purchase', 'ix_purchase_active_next_payout_date', ['active', 'next_payout_date']),
+    ('recharge', 'ix_recharge_user_id_status', ['user_id', 'status']),
+    ('recharge', 'ix_recharge_status_id', ['status', 'id']),
+    ('withdrawal', 'ix_withdrawal_user_id_status', ['user_id', 'status']),
+    ('withdrawal', 'ix_withdrawal_status_id', ['status', 'id']),
+]
+
+
+def upgrade():
+    # db.create_all() already builds these on a fresh database
+    for table, name, columns in INDEXES:
+        op.create_index(name, table, columns, unique=False, if_not_exists=True)
+
+
+def downgrade():
+    for table, name, columns in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
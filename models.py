@@ -1,7 +1,8 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
+from db_routing import RoutingSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 
 # ---------------- User ----------------
 class User(db.Model):
@@ -32,6 +33,11 @@ class Product(db.Model):
 
 # ---------------- Purchase ----------------
 class Purchase(db.Model):
+    __table_args__ = (
+        db.Index("ix_purchase_user_id_active", "user_id", "active"),
+        db.Index("ix_purchase_active_next_payout_date", "active", "next_payout_date"),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("user.id", ondelete="CASCADE"), nullable=False)
     product_id = db.Column(db.Integer, db.ForeignKey("product.id", ondelete="CASCADE"), nullable=False)
@@ -43,18 +49,30 @@ class Purchase(db.Model):
 
 # ---------------- Recharge ----------------
 class Recharge(db.Model):
+    __table_args__ = (
+        db.Index("ix_recharge_user_id_status", "user_id", "status"),
+        db.Index("ix_recharge_status_id", "status", "id"),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("user.id", ondelete="CASCADE"), nullable=False)
     amount = db.Column(db.Float, nullable=False)
     status = db.Column(db.String(20), default="Pending")  # Pending, Approved, Rejected
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=True)
 
 
 # ---------------- Withdrawal ----------------
 class Withdrawal(db.Model):
+    __table_args__ = (
+        db.Index("ix_withdrawal_user_id_status", "user_id", "status"),
+        db.Index("ix_withdrawal_status_id", "status", "id"),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("user.id", ondelete="CASCADE"), nullable=False)
     amount = db.Column(db.Float, nullable=False)
     status = db.Column(db.String(20), default="Pending")  # Pending, Approved, Rejected
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=True)
 
 
 # ---------------- Settings ----------------
@@ -62,3 +80,84 @@ class Setting(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     key = db.Column(db.String(50), unique=True, nullable=False)
     value = db.Column(db.String(255), nullable=False)
+
+
+# ---------------- Settlement Runs ----------------
+class SettlementRun(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    run_date = db.Column(db.Date, unique=True, nullable=False)
+    last_purchase_id = db.Column(db.Integer, default=0, nullable=False)
+    rows_settled = db.Column(db.Integer, default=0, nullable=False)
+    amount_settled = db.Column(db.Float, default=0.0, nullable=False)
+    started_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+
+# ---------------- Ledger ----------------
+class LedgerEntry(db.Model):
+    # Append-only; amounts are signed integer minor units (1/100 K)
+    __table_args__ = (
+        db.Index("ix_ledger_entry_user_id_id", "user_id", "id"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id", ondelete="CASCADE"), nullable=False)
+    kind = db.Column(db.String(20), nullable=False)  # opening, payout, recharge, withdrawal, refund, purchase
+    amount = db.Column(db.Integer, nullable=False)
+    earnings = db.Column(db.Integer, default=0, nullable=False)
+    ref_id = db.Column(db.Integer, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class BalanceSnapshot(db.Model):
+    __table_args__ = (
+        db.Index("ix_balance_snapshot_user_id_id", "user_id", "id"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id", ondelete="CASCADE"), nullable=False)
+    last_entry_id = db.Column(db.Integer, nullable=False)
+    balance = db.Column(db.Integer, nullable=False)
+    earnings = db.Column(db.Integer, nullable=False)
+    taken_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+# ---------------- Daily Earnings ----------------
+class DailyEarning(db.Model):
+    # Payouts credited per user per day, maintained by settlement
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id", ondelete="CASCADE"), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    amount = db.Column(db.Float, default=0.0, nullable=False)
+
+
+# ---------------- Idempotency Keys ----------------
+class IdempotencyKey(db.Model):
+    # First response to a keyed write; status stays NULL while it is in flight
+    __table_args__ = (
+        db.Index("ix_idempotency_key_created_at", "created_at"),
+    )
+
+    scope = db.Column(db.String(40), primary_key=True)  # user:<id> or admin
+    path = db.Column(db.String(200), primary_key=True)
+    key = db.Column(db.String(64), primary_key=True)
+    status = db.Column(db.Integer, nullable=True)
+    mimetype = db.Column(db.String(100), nullable=True)
+    location = db.Column(db.String(255), nullable=True)
+    body = db.Column(db.Text, nullable=True)
+    flashes = db.Column(db.Text, nullable=True)  # JSON list of [category, message]
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+
+# ---------------- Stream Events ----------------
+class StreamEvent(db.Model):
+    # Status changes for /events streams, read by every worker's relay; pruned by purge-stream-events
+    __table_args__ = (
+        db.Index("ix_stream_event_user_id_id", "user_id", "id"),
+        db.Index("ix_stream_event_created_at", "created_at"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id", ondelete="CASCADE"), nullable=False)
+    kind = db.Column(db.String(20), nullable=False)  # recharge, withdrawal
+    data = db.Column(db.Text, nullable=False)  # JSON payload sent to the browser
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
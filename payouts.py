@@ -0,0 +1,156 @@
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select, update, bindparam
+
+from models import db, User, Product, Purchase
+from ledger import apply_credits, to_cents
+from earnings_series import record_payouts
+
+# 20% of product price daily
+DAILY_RATE = 0.20
+
+
+class StalePayouts(Exception):
+    """A purchase changed between computing its payout and applying it."""
+
+
+def utc_today():
+    return datetime.now(timezone.utc).date()
+
+
+def _due(stmt, today):
+    return stmt.where(Purchase.active.is_(True)).where(
+        (Purchase.next_payout_date.is_(None)) | (Purchase.next_payout_date <= today)
+    )
+
+
+def due_purchases_stmt(today, after_id=0, limit=1000):
+    stmt = _due(select(Purchase.id), today).where(Purchase.id > after_id)
+    return stmt.order_by(Purchase.id).limit(limit)
+
+
+def due_purchase_ids(today=None, after_id=0, limit=1000):
+    """Return the next ``limit`` due purchase ids above ``after_id``."""
+    return db.session.scalars(due_purchases_stmt(today or utc_today(), after_id, limit)).all()
+
+
+def compute_payouts(user_id=None, purchase_ids=None, today=None, lock=False):
+    """Work out what every due purchase is owed without touching the session.
+
+    Returns a list of dicts with the new purchase state (and the state it
+    was computed from) and the amount to credit; rows whose only change is a
+    backfilled ``next_payout_date`` carry an amount of 0.0 so that the
+    backfill is still persisted. ``lock`` takes row locks where the
+    database supports SELECT ... FOR UPDATE.
+    """
+    today = today or utc_today()
+    stmt = _due(
+        select(
+            Purchase.id,
+            Purchase.user_id,
+            Purchase.purchased_at,
+            Purchase.next_payout_date,
+            Purchase.remaining_days,
+            Product.price,
+        )
+        .join(Product, Product.id == Purchase.product_id)
+        .join(User, User.id == Purchase.user_id),
+        today,
+    ).order_by(Purchase.id)
+    if user_id is not None:
+        stmt = stmt.where(Purchase.user_id == user_id)
+    if purchase_ids is not None:
+        stmt = stmt.where(Purchase.id.in_(purchase_ids))
+    if lock:
+        stmt = stmt.with_for_update(of=Purchase)
+
+    payouts = []
+    for row in db.session.execute(stmt):
+        next_payout = row.next_payout_date
+        if next_payout is None:
+            if not row.purchased_at:
+                continue
+            next_payout = row.purchased_at.date() + timedelta(days=1)
+        backfilled = row.next_payout_date is None
+
+        days_due = (today - next_payout).days + 1
+        days_to_credit = min(days_due, row.remaining_days)
+        if days_to_credit <= 0:
+            if backfilled:
+                payouts.append({
+                    "id": row.id,
+                    "user_id": row.user_id,
+                    "old_remaining_days": row.remaining_days,
+                    "old_next_payout_date": row.next_payout_date,
+                    "amount": 0.0,
+                    "days": 0,
+                    "remaining_days": row.remaining_days,
+                    "next_payout_date": next_payout,
+                    "active": True,
+                })
+            continue
+
+        remaining = row.remaining_days - days_to_credit
+        payouts.append({
+            "id": row.id,
+            "user_id": row.user_id,
+            "old_remaining_days": row.remaining_days,
+            "old_next_payout_date": row.next_payout_date,
+            "amount": to_cents(days_to_credit * (row.price * DAILY_RATE)),
+            "days": days_to_credit,
+            "remaining_days": remaining,
+            "next_payout_date": next_payout + timedelta(days=days_to_credit),
+            "active": remaining > 0,
+        })
+    return payouts
+
+
+def apply_payouts(payouts):
+    """Write computed payouts and their ledger entries; the caller commits.
+
+    Core table statements are used so the UPDATEs bypass the ORM unit of
+    work; instances already loaded in the session are refreshed on commit.
+    Each purchase only moves from the state its payout was computed from;
+    if another run got there first ``StalePayouts`` is raised so the caller
+    rolls back and recomputes instead of paying twice.
+    """
+    if not payouts:
+        return
+
+    purchases = Purchase.__table__
+    result = db.session.execute(
+        update(purchases)
+        .where(
+            purchases.c.id == bindparam("p_id"),
+            purchases.c.remaining_days == bindparam("p_old_remaining"),
+            purchases.c.next_payout_date.is_not_distinct_from(bindparam("p_old_next")),
+        )
+        .values(
+            remaining_days=bindparam("p_remaining"),
+            next_payout_date=bindparam("p_next"),
+            active=bindparam("p_active"),
+        ),
+        [
+            {
+                "p_id": p["id"],
+                "p_old_remaining": p["old_remaining_days"],
+                "p_old_next": p["old_next_payout_date"],
+                "p_remaining": p["remaining_days"],
+                "p_next": p["next_payout_date"],
+                "p_active": p["active"],
+            }
+            for p in payouts
+        ],
+    )
+    # Drivers that cannot count executemany rows (psycopg2 in values_plus_batch
+    # mode) rely on the FOR UPDATE in compute_payouts(lock=True) instead
+    if result.rowcount != len(payouts) and db.session.get_bind().dialect.supports_sane_multi_rowcount:
+        raise StalePayouts()
+
+    apply_credits([
+        {"user_id": p["user_id"], "kind": "payout", "amount": p["amount"],
+         "ref_id": p["id"], "earnings": True}
+        for p in payouts if p["amount"]
+    ])
+    record_payouts(payouts)
+
@@ -0,0 +1,124 @@
+from array import array
+from datetime import timedelta
+
+from sqlalchemy import select, func, case
+
+from models import db, Product, Purchase
+from payouts import DAILY_RATE, utc_today
+
+try:
+    import numpy as np
+except ImportError:  # optional; the array module path gives the same numbers
+    np = None
+
+PROJECTION_CHUNK = 65536
+MAX_HORIZON = 366
+
+
+def schedule_stmt():
+    """Active purchases collapsed to one row per (next payout, remaining days).
+
+    Purchases that share a schedule pay the same days, so only their summed
+    daily amount matters; millions of rows fold into a few thousand groups.
+    Rows not yet backfilled by settlement keep their purchase time instead.
+    """
+    legacy_start = case((Purchase.next_payout_date.is_(None), Purchase.purchased_at), else_=None)
+    return (
+        select(
+            Purchase.next_payout_date,
+            legacy_start.label("purchased_at"),
+            Purchase.remaining_days,
+            func.sum(Product.price).label("principal"),
+            func.count().label("purchases"),
+        )
+        .join(Product, Product.id == Purchase.product_id)
+        .where(Purchase.active.is_(True), Purchase.remaining_days > 0)
+        .group_by(Purchase.next_payout_date, legacy_start, Purchase.remaining_days)
+    )
+
+
+def _columns(rows, today, rate):
+    """Turn schedule rows into (offset, remaining, daily) column arrays."""
+    offsets, remaining, daily = array("q"), array("q"), array("d")
+    purchases = 0
+    for row in rows:
+        start = row.next_payout_date
+        if start is None:
+            if row.purchased_at is None:
+                continue
+            start = row.purchased_at.date() + timedelta(days=1)
+        offsets.append((start - today).days)
+        remaining.append(row.remaining_days)
+        daily.append(row.principal * rate)
+        purchases += row.purchases
+    return offsets, remaining, daily, purchases
+
+
+def _accumulate(diff, offsets, remaining, daily, horizon):
+    """Add one chunk of schedules to the difference array ``diff``.
+
+    An overdue schedule (offset < 0) is caught up in one lump on day 0, as
+    settlement does, then pays daily from day 1. Returns the day-0 lump and
+    the total still owed across all remaining days.
+    """
+    if np is not None:
+        offsets = np.frombuffer(offsets, dtype=np.int64)
+        remaining = np.frombuffer(remaining, dtype=np.int64)
+        daily = np.frombuffer(daily, dtype=np.float64)
+        overdue = offsets < 0
+        caught_up = np.where(overdue, np.minimum(1 - offsets, remaining), 0)
+        begin = np.minimum(np.where(overdue, 1, offsets), horizon)
+        end = np.minimum(begin + remaining - caught_up, horizon)
+        np.add.at(diff, begin, daily)
+        np.add.at(diff, end, -daily)
+        return float(daily @ caught_up), float(daily @ remaining)
+
+    lump = owed = 0.0
+    for offset, days, amount in zip(offsets, remaining, daily):
+        caught_up = min(1 - offset, days) if offset < 0 else 0
+        begin = min(1 if offset < 0 else offset, horizon)
+        diff[begin] += amount
+        diff[min(begin + days - caught_up, horizon)] -= amount
+        lump += amount * caught_up
+        owed += amount * days
+    return lump, owed
+
+
+def project_payouts(days=30, rate=DAILY_RATE, today=None, chunk_size=PROJECTION_CHUNK):
+    """Payouts owed on each of the next ``days`` days across all users.
+
+    ``rate`` is the daily payout as a fraction of price, for what-if runs.
+
+    Schedules stream in ``chunk_size`` partitions into a difference array
+    of ``days + 1`` slots, so memory is bounded by the chunk and horizon,
+    not by the number of purchases.
+    """
+    today = today or utc_today()
+    days = max(1, min(days, MAX_HORIZON))
+    diff = np.zeros(days + 1) if np is not None else array("d", bytes(8 * (days + 1)))
+    lump = owed = 0.0
+    purchases = 0
+
+    result = db.session.execute(schedule_stmt().execution_options(yield_per=chunk_size))
+    for rows in result.partitions():
+        offsets, remaining, daily, count = _columns(rows, today, rate)
+        chunk_lump, chunk_owed = _accumulate(diff, offsets, remaining, daily, days)
+        lump += chunk_lump
+        owed += chunk_owed
+        purchases += count
+
+    running = 0.0
+    schedule = []
+    for i in range(days):
+        running += diff[i]
+        amount = running + (lump if i == 0 else 0.0)
+        schedule.append({"date": (today + timedelta(days=i)).isoformat(), "amount": round(amount, 2)})
+    return {
+        "start": today.isoformat(),
+        "rate": rate,
+        "days": schedule,
+        "horizon_total": round(sum(d["amount"] for d in schedule), 2),
+        "outstanding_total": round(owed, 2),
+        "active_purchases": purchases,
+        "engine": "numpy" if np is not None else "array",
+    }
@@ -0,0 +1,59 @@
+import sys
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import select, text
+
+from models import db, Purchase, Recharge, Withdrawal
+from payouts import due_purchases_stmt, utc_today
+
+
+def hot_queries():
+    """The lookups every page view or settlement run depends on."""
+    return {
+        "active purchases for user": select(Purchase).filter_by(user_id=1, active=True),
+        "purchases for user": select(Purchase).filter_by(user_id=1),
+        "withdrawals for user": select(Withdrawal).filter_by(user_id=1),
+        "recharges for user": select(Recharge).filter_by(user_id=1),
+        "pending withdrawals": select(Withdrawal).filter_by(status="Pending").order_by(Withdrawal.id).limit(50),
+        "pending recharges": select(Recharge).filter_by(status="Pending").order_by(Recharge.id).limit(50),
+        "due purchases": due_purchases_stmt(utc_today()),
+    }
+
+
+def explain(stmt):
+    sql = str(stmt.compile(db.engine, compile_kwargs={"literal_binds": True}))
+    if db.engine.dialect.name == "sqlite":
+        return [row[-1] for row in db.session.execute(text("EXPLAIN QUERY PLAN " + sql))]
+    # Postgres happily seq-scans small tables; only report scans no index can avoid
+    db.session.execute(text("SET LOCAL enable_seqscan = off"))
+    plan = [row[0].strip() for row in db.session.execute(text("EXPLAIN " + sql))]
+    db.session.rollback()
+    return plan
+
+
+def is_full_scan(step):
+    return step.startswith("SCAN ") or "Seq Scan" in step
+
+
+def full_scans(queries=None):
+    """Return ``{name: plan}`` for every hot query answered with a table scan."""
+    failures = {}
+    for name, stmt in (queries or hot_queries()).items():
+        plan = explain(stmt)
+        if any(is_full_scan(step) for step in plan):
+            failures[name] = plan
+    return failures
+
+
+@click.command("check-query-plans")
+@with_appcontext
+def check_query_plans_command():
+    """Fail if any hot query falls back to a full table scan."""
+    for name, stmt in hot_queries().items():
+        click.echo(f"{name}: {' | '.join(explain(stmt))}")
+    failures = full_scans()
+    if failures:
+        for name in failures:
+            click.echo(f"FULL SCAN: {name}", err=True)
+        sys.exit(1)
@@ -0,0 +1,84 @@
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import request, session
+
+from idempotency import cached_replay
+
+RATE_LIMIT_PER_SEC = 1.0
+RATE_LIMIT_BURST = 5
+RATE_LIMIT_MAX_KEYS = 10000
+
+
+class RateLimited(Exception):
+    def __init__(self, retry_after):
+        super().__init__(retry_after)
+        self.retry_after = retry_after
+
+
+class TokenBucketLimiter:
+    """One token bucket per user, refilled at ``rate`` per second up to ``burst``.
+
+    Buckets live in a bounded LRU per worker process, so limits are per
+    worker and a long-idle user simply starts again with a full bucket.
+    A ``rate`` of 0 turns limiting off.
+    """
+
+    def __init__(self, rate=RATE_LIMIT_PER_SEC, burst=RATE_LIMIT_BURST, max_keys=RATE_LIMIT_MAX_KEYS):
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+        self.configure(rate, burst, max_keys)
+
+    def configure(self, rate=RATE_LIMIT_PER_SEC, burst=RATE_LIMIT_BURST, max_keys=RATE_LIMIT_MAX_KEYS):
+        with self._lock:
+            self.rate = rate
+            self.burst = burst
+            self.max_keys = max_keys
+            self._buckets.clear()
+
+    def init_app(self, app):
+        self.configure(
+            rate=app.config.get("RATE_LIMIT_PER_SEC", RATE_LIMIT_PER_SEC),
+            burst=app.config.get("RATE_LIMIT_BURST", RATE_LIMIT_BURST),
+        )
+
+    def acquire(self, key):
+        """Take a token for ``key``; returns 0 or the seconds until one is free."""
+        if not self.rate:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            tokens, updated = self._buckets.pop(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / self.rate
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return wait
+
+
+limiter = TokenBucketLimiter()
+
+
+def rate_limited(view):
+    """Shed non-GET requests beyond the user's bucket with ``RateLimited``.
+
+    Needs only the session, so it goes outermost and sheds before any
+    database work. Replays this worker can answer from memory are free.
+    """
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if request.method != "GET" and cached_replay() is None:
+            wait = limiter.acquire(session.get("user_id") or request.remote_addr)
+            if wait:
+                raise RateLimited(wait)
+        return view(*args, **kwargs)
+
+    return wrapper
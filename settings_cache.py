@@ -0,0 +1,60 @@
+import threading
+import time
+
+from sqlalchemy import select, update, cast, Integer, String
+
+from models import db, Setting
+
+SETTINGS_TTL = 30  # seconds a worker may serve values before re-checking
+VERSION_KEY = "settings_version"
+
+
+class SettingsCache:
+    """All Setting rows held in memory, refreshed when the DB version moves.
+
+    Every worker re-checks the single version row at most once per TTL and
+    reloads the whole table in one query only when it changed, so an update
+    made through any worker is visible everywhere within ``ttl`` seconds.
+    """
+
+    def __init__(self, ttl=SETTINGS_TTL):
+        self.ttl = ttl
+        self._values = None
+        self._version = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if self._values is None or time.monotonic() - self._checked_at > self.ttl:
+                self._refresh()
+            return self._values.get(key, default)
+
+    def invalidate(self):
+        with self._lock:
+            self._values = None
+
+    def _refresh(self):
+        if self._values is not None:
+            version = db.session.scalar(select(Setting.value).where(Setting.key == VERSION_KEY))
+            if version == self._version:
+                self._checked_at = time.monotonic()
+                return
+        self._values = dict(db.session.execute(select(Setting.key, Setting.value)).all())
+        self._version = self._values.get(VERSION_KEY)
+        self._checked_at = time.monotonic()
+
+
+def bump_version():
+    """Advance the shared version so other workers reload; the caller commits."""
+    result = db.session.execute(
+        update(Setting)
+        .where(Setting.key == VERSION_KEY)
+        .values(value=cast(cast(Setting.value, Integer) + 1, String))
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount == 0:
+        db.session.add(Setting(key=VERSION_KEY, value="1"))
+
+
+settings = SettingsCache()
@@ -0,0 +1,116 @@
+import time
+from datetime import datetime
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+
+from models import db, SettlementRun
+from payouts import due_purchase_ids, compute_payouts, apply_payouts, utc_today, StalePayouts
+from ledger import run_with_retry
+from earnings_series import series_cache
+
+
+class SettlementConflict(Exception):
+    pass
+
+
+def _advance(run_id, previous, cursor, rows, amount):
+    """Move the run's checkpoint on only if nobody else has since ``previous``."""
+    runs = SettlementRun.__table__
+    claimed = db.session.execute(
+        update(runs)
+        .where(runs.c.id == run_id, runs.c.last_purchase_id == previous)
+        .values(
+            last_purchase_id=cursor,
+            rows_settled=runs.c.rows_settled + rows,
+            amount_settled=runs.c.amount_settled + amount,
+        )
+    )
+    if claimed.rowcount != 1:
+        raise SettlementConflict()
+
+
+def settle(run_date=None, chunk_size=1000, dry_run=False, echo=click.echo):
+    """Settle every purchase due on ``run_date`` in id-ordered chunks.
+
+    Each chunk is computed and applied together with the run's checkpoint
+    in one transaction, so an interrupted run resumes after the last
+    committed purchase id and an overlapping run for the same day stops at
+    the first chunk the other one already took. Returns
+    ``(rows, amount, seconds)``.
+    """
+    run_date = run_date or utc_today()
+    if run_date > utc_today():
+        raise ValueError(f"Cannot settle {run_date}: it is later than today (UTC).")
+    run = SettlementRun.query.filter_by(run_date=run_date).first()
+    if run and run.finished_at:
+        echo(f"Settlement for {run_date} already finished at {run.finished_at:%Y-%m-%d %H:%M:%S}.")
+        return 0, 0.0, 0.0
+    if run is None:
+        run = SettlementRun(run_date=run_date, last_purchase_id=0, rows_settled=0, amount_settled=0.0)
+        if not dry_run:
+            db.session.add(run)
+            try:
+                db.session.commit()
+            except IntegrityError:
+                db.session.rollback()
+                echo(f"Another settlement run for {run_date} has just started; not starting a second one.")
+                return 0, 0.0, 0.0
+    elif run.last_purchase_id:
+        echo(f"Resuming settlement for {run_date} after purchase #{run.last_purchase_id}.")
+
+    run_id, cursor = run.id, run.last_purchase_id
+    conflict = False
+    rows = 0
+    amount = 0.0
+    started = time.perf_counter()
+    while True:
+        ids = due_purchase_ids(today=run_date, after_id=cursor, limit=chunk_size)
+        if not ids:
+            break
+        previous, cursor = cursor, ids[-1]
+        if dry_run:
+            payouts = compute_payouts(purchase_ids=ids, today=run_date)
+            db.session.rollback()
+        else:
+            def apply_chunk():
+                chunk = compute_payouts(purchase_ids=ids, today=run_date, lock=True)
+                _advance(run_id, previous, cursor, len(chunk), sum(p["amount"] for p in chunk))
+                apply_payouts(chunk)
+                return chunk
+
+            try:
+                payouts = run_with_retry(apply_chunk, retry_on=(StalePayouts,))
+            except SettlementConflict:
+                echo(f"Another settlement run for {run_date} already settled past purchase #{previous}; stopping.")
+                conflict = True
+                break
+            series_cache.invalidate({p["user_id"] for p in payouts})
+        rows += len(payouts)
+        amount += sum(p["amount"] for p in payouts)
+
+    if not dry_run and not conflict:
+        run.finished_at = datetime.utcnow()
+        db.session.commit()
+
+    elapsed = time.perf_counter() - started
+    rate = rows / elapsed if elapsed > 0 else 0.0
+    prefix = "[dry-run] " if dry_run else ""
+    echo(f"{prefix}Settled {rows} purchases (K{amount:.2f}) for {run_date} "
+         f"in {elapsed:.2f}s ({rate:.0f} rows/s).")
+    return rows, amount, elapsed
+
+
+@click.command("settle")
+@click.option("--date", "run_date", type=click.DateTime(formats=["%Y-%m-%d"]), default=None,
+              help="Settlement date (YYYY-MM-DD); defaults to today (UTC).")
+@click.option("--chunk-size", default=1000, show_default=True, help="Purchases per transaction.")
+@click.option("--dry-run", is_flag=True, help="Compute payouts without writing anything.")
+@with_appcontext
+def settle_command(run_date, chunk_size, dry_run):
+    """Credit all due purchase payouts for one day."""
+    if run_date and run_date.date() > utc_today():
+        raise click.BadParameter("cannot settle a day that has not happened yet (UTC).", param_hint="'--date'")
+    settle(run_date=run_date.date() if run_date else None, chunk_size=chunk_size, dry_run=dry_run)
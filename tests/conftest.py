@@ -0,0 +1,98 @@
+import itertools
+import os
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+
+from app import create_app
+from catalog import catalog
+from earnings_series import series_cache
+from init_db import init_db
+from models import db, User
+from settings_cache import settings
+
+
+def reset_caches():
+    """Empty the per-process caches so the next request starts cold."""
+    catalog.invalidate()
+    settings.invalidate()
+    series_cache.invalidate()
+
+
+TEST_POSTGRES_URL = os.environ.get("TEST_POSTGRES_URL", "postgresql://postgres@127.0.0.1:5432/app_test")
+
+
+def _postgres_url():
+    """TEST_POSTGRES_URL if a server answers there, else skip the test."""
+    pytest.importorskip("psycopg2")
+    engine = create_engine(TEST_POSTGRES_URL)
+    try:
+        engine.connect().close()
+    except OperationalError as e:
+        pytest.skip(f"Postgres unavailable at {TEST_POSTGRES_URL}: {e.orig}")
+    finally:
+        engine.dispose()
+    return TEST_POSTGRES_URL
+
+
+@pytest.fixture(params=["sqlite", "postgresql"])
+def database_url(request, tmp_path):
+    """Every app test runs on SQLite and, when reachable, on Postgres."""
+    if request.param == "sqlite":
+        return f"sqlite:///{tmp_path / 'test.db'}"
+    return _postgres_url()
+
+
+@pytest.fixture
+def app(database_url):
+    """A fresh app on an empty database, schema built by init_db()."""
+    app = create_app({"SQLALCHEMY_DATABASE_URI": database_url, "TESTING": True})
+    reset_caches()
+    with app.app_context():
+        db.drop_all()  # a shared Postgres database may hold a previous run's tables
+        init_db()
+        yield app
+        db.session.remove()
+        db.drop_all()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def cold_caches():
+    return reset_caches
+
+
+@pytest.fixture
+def make_user(app):
+    """Factory: insert a user with a unique phone number and return its id."""
+    numbers = itertools.count()
+
+    def make_user(balance=0.0, earnings=0.0):
+        user = User(phone_number=f"097{next(numbers):07d}", password="x", balance=balance, earnings=earnings)
+        db.session.add(user)
+        db.session.commit()
+        return user.id
+
+    return make_user
+
+
+@pytest.fixture
+def user_id(make_user):
+    return make_user()
+
+
+@pytest.fixture
+def login(app):
+    """Factory: a test client whose session belongs to ``user_id`` (and/or admin)."""
+
+    def login(user_id=None, admin=False):
+        client = app.test_client()
+        with client.session_transaction() as s:
+            if user_id is not None:
+                s["user_id"] = user_id
+            if admin:
+                s["admin"] = True
+        return client
+
+    return login
@@ -0,0 +1,46 @@
+import pytest
+
+from app import create_app, dashboard_history, pool_options
+from init_db import init_db
+from models import db, Product, Purchase, Recharge, Withdrawal
+
+
+@pytest.mark.parametrize("uri", ["sqlite://", "sqlite:///:memory:", "sqlite:///file:mem?mode=memory&uri=true"])
+def test_in_memory_sqlite_gets_no_pool_sizing(uri):
+    assert pool_options(uri) == {}
+
+
+def test_file_and_server_databases_get_pool_sizing():
+    for uri in ("sqlite:////tmp/app.db", "postgresql://u@localhost/app"):
+        assert {"pool_size", "max_overflow", "pool_timeout"} <= set(pool_options(uri))
+
+
+def test_app_runs_on_in_memory_sqlite():
+    app = create_app({"SQLALCHEMY_DATABASE_URI": "sqlite://", "TESTING": True})
+    with app.app_context():
+        init_db()
+        assert db.session.query(Product).count() > 0
+        db.session.remove()
+        db.engine.dispose()
+
+
+def test_dashboard_history_merges_rows_and_daily_total(user_id):
+    product = db.session.scalars(db.select(Product).filter_by(price=150.0)).one()
+    db.session.add_all([
+        Withdrawal(user_id=user_id, amount=60.0, status="Pending"),
+        Recharge(user_id=user_id, amount=100.0, status="Approved"),
+        Recharge(user_id=user_id, amount=50.0, status="Pending"),
+        Purchase(user_id=user_id, product_id=product.id, remaining_days=20, active=True),
+        Purchase(user_id=user_id, product_id=product.id, remaining_days=0, active=False),
+    ])
+    db.session.commit()
+
+    withdrawals, recharges, daily = dashboard_history(user_id)
+
+    assert [(r.amount, r.status) for r in withdrawals] == [(60.0, "Pending")]
+    assert [(r.amount, r.status) for r in recharges] == [(100.0, "Approved"), (50.0, "Pending")]
+    assert daily == 30.0
+
+
+def test_dashboard_history_without_purchases_has_zero_daily(app):
+    assert dashboard_history(12345) == ([], [], 0.0)
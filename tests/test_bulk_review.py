@@ -0,0 +1,28 @@
+from bulk_review import bulk_review
+from ledger import audit
+from models import db, Recharge, User, Withdrawal
+
+
+def seed(user_id, model, statuses):
+    rows = [model(user_id=user_id, amount=100.0, status=status) for status in statuses]
+    db.session.add_all(rows)
+    db.session.commit()
+    return [row.id for row in rows]
+
+
+def test_approving_recharges_credits_only_pending_rows(user_id):
+    ids = seed(user_id, Recharge, ["Pending", "Pending", "Rejected"])
+
+    report = bulk_review(Recharge, ids + [9999], "approve")
+
+    assert report == {ids[0]: "Approved", ids[1]: "Approved", ids[2]: "already Rejected", 9999: "not found"}
+    assert db.session.get(User, user_id).balance == 200.0
+    assert list(audit()) == []
+
+
+def test_second_review_of_the_same_rows_changes_nothing(user_id):
+    ids = seed(user_id, Withdrawal, ["Pending", "Pending"])
+
+    assert bulk_review(Withdrawal, ids, "reject") == {i: "Rejected" for i in ids}
+    assert bulk_review(Withdrawal, ids, "reject") == {i: "already Rejected" for i in ids}
+    assert db.session.get(User, user_id).balance == 200.0  # refunded once
@@ -0,0 +1,15 @@
+from earnings_series import SeriesCache
+from payouts import utc_today
+
+
+def test_cache_keeps_only_the_most_recently_used_users(app, make_user):
+    cache = SeriesCache(maxsize=2)
+    first, second, third = make_user(), make_user(), make_user()
+    today = utc_today()
+
+    cache.get(first, today)
+    cache.get(second, today)
+    cache.get(first, today)  # now the most recent
+    cache.get(third, today)
+
+    assert list(cache._entries) == [first, third]
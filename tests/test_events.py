@@ -0,0 +1,63 @@
+import json
+
+from bulk_review import bulk_review
+from events import EventRelay, broker, stream
+from ledger import apply_credits, run_with_retry
+from models import db, Withdrawal
+
+
+def test_stream_closes_after_its_lifetime(app):
+    chunks = list(stream(1, heartbeat=0.01, lifetime=0.05))
+    assert chunks[0] == ": connected\n\n"
+    assert ": ping\n\n" in chunks
+    assert broker.stream_count() == 0
+
+
+def test_streams_past_the_cap_are_told_to_retry(app, login, user_id):
+    app.config["SSE_MAX_STREAMS"] = 1
+    held = broker.subscribe(42)
+    try:
+        response = login(user_id).get("/events")
+        assert response.status_code == 200
+        assert response.get_data(as_text=True).startswith("retry: ")
+    finally:
+        broker.unsubscribe(42, held)
+
+
+def test_relay_publishes_payouts_written_by_another_process(app, user_id):
+    relay = EventRelay()
+    q = broker.subscribe(user_id)
+    try:
+        relay.poll()  # starts at the current tail
+        # what `flask settle` does in its own process: only the ledger is shared
+        run_with_retry(lambda: apply_credits([{"user_id": user_id, "kind": "payout", "amount": 12.5, "earnings": True}]))
+        relay.poll()
+        relay.poll()  # the lookback window does not publish an entry twice
+        message = q.get_nowait()
+        assert q.empty()
+    finally:
+        broker.unsubscribe(user_id, q)
+
+    data = json.loads(message.split("data: ", 1)[1])
+    assert message.startswith("event: balance\n")
+    assert data == {"reason": "payout", "balance": 12.5, "earnings": 12.5}
+
+
+def test_relay_publishes_status_changes_made_in_another_worker(app, make_user):
+    user_id = make_user(balance=100.0)
+    withdrawal = Withdrawal(user_id=user_id, amount=60.0, status="Pending")
+    db.session.add(withdrawal)
+    db.session.commit()
+    relay = EventRelay()
+    q = broker.subscribe(user_id)
+    try:
+        relay.poll()
+        bulk_review(Withdrawal, [withdrawal.id], "approve")  # writes no ledger entry
+        relay.poll()
+        relay.poll()
+        message = q.get_nowait()
+        assert q.empty()
+    finally:
+        broker.unsubscribe(user_id, q)
+
+    assert message == f'event: withdrawal\ndata: {{"id": {withdrawal.id}, "status": "Approved"}}\n\n'
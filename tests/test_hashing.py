@@ -0,0 +1,44 @@
+import os
+import signal
+
+import pytest
+
+from hashing import HashPool, PoolSaturated
+
+
+@pytest.fixture
+def pool():
+    pool = HashPool(workers=1, rounds=4)
+    yield pool
+    pool.shutdown()
+
+
+def test_hash_round_trip_on_forkserver_children(pool):
+    pw_hash = pool.generate_password_hash("s3cret")
+    assert pool.check_password_hash(pw_hash, "s3cret")
+    assert not pool.check_password_hash(pw_hash, "wrong")
+    assert pool._executor._mp_context.get_start_method() == "forkserver"
+
+
+def test_slow_hash_is_shed_as_saturated(pool):
+    pool.configure(workers=1, rounds=12, timeout=0.001)
+    with pytest.raises(PoolSaturated):
+        pool.generate_password_hash("s3cret")
+
+
+def test_full_queue_is_shed_as_saturated(pool):
+    pool.configure(workers=1, rounds=4, queue_depth=1)
+    pool._slots.acquire()
+    with pytest.raises(PoolSaturated):
+        pool.generate_password_hash("s3cret")
+
+
+def test_killed_child_is_shed_then_the_pool_is_rebuilt(pool):
+    child = pool._pool().submit(os.getpid).result()
+    os.kill(child, signal.SIGKILL)
+
+    with pytest.raises(PoolSaturated):
+        pool.generate_password_hash("s3cret")
+    assert pool._executor is None
+
+    assert pool.check_password_hash(pool.generate_password_hash("s3cret"), "s3cret")
@@ -0,0 +1,90 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import idempotency
+from idempotency import replays
+from instrumentation import assert_max_queries
+from models import db, IdempotencyKey, User, Withdrawal
+from rate_limit import limiter
+
+FORM = {"amount": "100", "idempotency_key": "retry-1"}
+
+
+@pytest.fixture
+def client(login, make_user):
+    user_id = make_user(balance=500.0)
+    client = login(user_id)
+    client.user_id = user_id
+    return client
+
+
+def withdrawals(user_id):
+    return db.session.scalar(db.select(db.func.count()).select_from(Withdrawal).filter_by(user_id=user_id))
+
+
+def test_replayed_key_creates_one_withdrawal(client):
+    first = client.post("/withdraw", data=FORM)
+    again = client.post("/withdraw", data=FORM)
+
+    assert first.status_code == again.status_code == 302
+    assert "Idempotent-Replayed" not in first.headers
+    assert again.headers["Idempotent-Replayed"] == "true"
+    assert again.headers["Location"] == first.headers["Location"]
+    assert withdrawals(client.user_id) == 1
+    assert db.session.get(User, client.user_id).balance == 400.0
+
+
+def test_replay_falls_back_to_the_database(client):
+    client.post("/withdraw", data=FORM)
+    replays.configure()  # as if the retry landed on another worker
+
+    again = client.post("/withdraw", data=FORM)
+
+    assert again.headers["Idempotent-Replayed"] == "true"
+    assert withdrawals(client.user_id) == 1
+
+
+def test_key_still_in_flight_gets_409(client, monkeypatch):
+    monkeypatch.setattr(idempotency, "IDEMPOTENCY_WAIT", 0.1)
+    assert idempotency._claim((f"user:{client.user_id}", "/withdraw", FORM["idempotency_key"]))
+
+    response = client.post("/withdraw", data=FORM)
+
+    assert response.status_code == 409
+    assert response.headers["Retry-After"] == "1"
+    assert withdrawals(client.user_id) == 0
+
+
+def test_abandoned_claim_is_taken_over(client):
+    started = datetime.utcnow() - timedelta(seconds=replays.lease + 1)
+    db.session.add(IdempotencyKey(scope=f"user:{client.user_id}", path="/withdraw",
+                                  key=FORM["idempotency_key"], created_at=started))
+    db.session.commit()
+
+    response = client.post("/withdraw", data=FORM)
+
+    assert response.status_code == 302
+    assert withdrawals(client.user_id) == 1
+
+
+def test_burst_past_the_bucket_gets_429_before_any_query(client):
+    limiter.configure(rate=0.01, burst=2)
+    for _ in range(2):
+        assert client.post("/withdraw", data={"amount": "60"}).status_code == 302
+
+    with assert_max_queries(0):
+        response = client.post("/withdraw", data={"amount": "60"})
+
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+    assert withdrawals(client.user_id) == 2
+
+
+def test_cached_replays_spend_no_tokens(client):
+    limiter.configure(rate=0.01, burst=1)
+    assert client.post("/withdraw", data=FORM).status_code == 302
+
+    for _ in range(3):
+        assert client.post("/withdraw", data=FORM).headers["Idempotent-Replayed"] == "true"
+    assert client.post("/withdraw", data={"amount": "60"}).status_code == 429
@@ -0,0 +1,40 @@
+import pytest
+
+from ledger import apply_credits, audit, debit, open_balances, parse_amount, run_with_retry
+from models import db, User
+
+
+@pytest.fixture
+def user_id(make_user):
+    return make_user(balance=500.0)
+
+
+def test_sub_cent_amounts_keep_balance_and_ledger_in_step(app, user_id):
+    run_with_retry(open_balances)
+    run_with_retry(lambda: debit(user_id, 50.555, "withdrawal"))
+    run_with_retry(lambda: apply_credits([{"user_id": user_id, "kind": "recharge", "amount": 0.004}]))
+    run_with_retry(lambda: apply_credits([{"user_id": user_id, "kind": "payout", "amount": 6.666, "earnings": True}]))
+
+    assert list(audit()) == []
+    assert db.session.get(User, user_id).balance == pytest.approx(500.0 - 50.56 + 6.67)
+
+
+@pytest.mark.parametrize("raw", ["10", "10.5", "10.25", " 7.00 ", "1e2"])
+def test_parse_amount_accepts_minor_units(raw):
+    assert parse_amount(raw) == float(raw)
+
+
+@pytest.mark.parametrize("raw", [None, "", "abc", "50.555", "0.004", "nan", "inf"])
+def test_parse_amount_rejects_more_than_two_decimals(raw):
+    with pytest.raises(ValueError):
+        parse_amount(raw)
+
+
+@pytest.mark.parametrize("path, form", [
+    ("/withdraw", {"amount": "50.555"}),
+    ("/recharge", {"amount": "0.004", "wallet_number": "0970000001"}),
+])
+def test_forms_reject_sub_cent_amounts(login, user_id, path, form):
+    response = login(user_id).post(path, data=form)
+    assert response.headers["Location"] == path
+    assert db.session.get(User, user_id).balance == 500.0
@@ -0,0 +1,45 @@
+import os
+import shutil
+
+import pytest
+from flask_migrate import Migrate, upgrade
+from sqlalchemy import inspect, text
+
+from app import BASE_DIR, DB_FILE, create_app
+from models import db
+
+MIGRATIONS = os.path.join(BASE_DIR, "migrations")
+
+
+def head_schema_matches_models():
+    inspector = inspect(db.engine)
+    for table in db.metadata.sorted_tables:
+        assert {c["name"] for c in inspector.get_columns(table.name)} == set(table.columns.keys()), table.name
+        assert {i["name"] for i in inspector.get_indexes(table.name)} >= {i.name for i in table.indexes}, table.name
+
+
+def current_revision():
+    return db.session.execute(text("SELECT version_num FROM alembic_version")).scalar()
+
+
+def test_upgrade_after_init_db_reaches_head(app):
+    Migrate(app, db, directory=MIGRATIONS)
+    try:
+        upgrade()
+        upgrade()  # already at head: nothing to do
+
+        assert current_revision() is not None
+        head_schema_matches_models()
+    finally:
+        db.session.execute(text("DROP TABLE IF EXISTS alembic_version"))
+        db.session.commit()
+
+
+def test_upgrade_alone_brings_the_shipped_database_up_to_the_models(tmp_path):
+    shutil.copy(DB_FILE, tmp_path / "shipped.db")
+    app = create_app({"SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'shipped.db'}"})
+    Migrate(app, db, directory=MIGRATIONS)
+    with app.app_context():
+        upgrade()
+        head_schema_matches_models()
+        db.engine.dispose()
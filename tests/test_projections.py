@@ -0,0 +1,48 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import projections
+from models import db, Product, Purchase
+from payouts import utc_today
+
+ENGINES = ["numpy", "array"]
+
+
+@pytest.fixture(params=ENGINES)
+def engine(request, monkeypatch):
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(projections, "np", None)
+    return request.param
+
+
+@pytest.fixture
+def today(user_id):
+    today = utc_today()
+    product_id = db.session.scalar(db.select(Product.id).filter_by(price=50.0))  # K10 a day
+    schedules = [
+        (today - timedelta(days=2), 5),  # overdue: 3 days on day 0, then 2 more
+        (today, 1),
+        (today + timedelta(days=3), 2),
+        (today + timedelta(days=4), 20),  # runs past the horizon
+        (None, 3),  # legacy row: first payout the day after purchase
+    ]
+    db.session.add_all([
+        Purchase(user_id=user_id, product_id=product_id, next_payout_date=start, remaining_days=left,
+                 purchased_at=datetime.combine(today - timedelta(days=1), datetime.min.time()), active=True)
+        for start, left in schedules
+    ])
+    db.session.commit()
+    return today
+
+
+def test_schedule_matches_a_hand_worked_one(engine, today):
+    report = projections.project_payouts(days=6, today=today, chunk_size=2)
+
+    assert report["engine"] == engine
+    assert [d["amount"] for d in report["days"]] == [50.0, 20.0, 20.0, 10.0, 20.0, 10.0]
+    assert report["horizon_total"] == 130.0
+    assert report["outstanding_total"] == 310.0
+    assert report["active_purchases"] == 5
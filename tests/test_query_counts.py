@@ -0,0 +1,36 @@
+import pytest
+
+from instrumentation import assert_max_queries
+from models import db, Product, Purchase, Recharge, Withdrawal
+
+# Cold-cache upper bounds; none of them may grow with the number of rows
+ROUTES = {
+    "/dashboard": 3,  # user, settings, history UNION ALL
+    "/dashboard/chart-data": 2,  # user, daily earnings series
+    "/my_purchases": 2,  # user, purchases joined to products
+    "/admin/withdrawals": 1,
+    "/admin/recharges": 1,
+}
+
+
+def seed(user_id, rows):
+    product_id = db.session.scalar(db.select(Product.id))
+    db.session.execute(Purchase.__table__.insert(), [
+        {"user_id": user_id, "product_id": product_id, "remaining_days": 5, "active": True}] * rows)
+    db.session.execute(Recharge.__table__.insert(), [
+        {"user_id": user_id, "amount": 100.0, "status": "Pending"}] * rows)
+    db.session.execute(Withdrawal.__table__.insert(), [
+        {"user_id": user_id, "amount": 60.0, "status": "Pending"}] * rows)
+    db.session.commit()
+
+
+@pytest.mark.parametrize("rows", [1, 40])
+@pytest.mark.parametrize("path", list(ROUTES))
+def test_query_count_does_not_grow_with_rows(login, cold_caches, user_id, path, rows):
+    seed(user_id, rows)
+    client = login(user_id, admin=True)
+    cold_caches()
+
+    with assert_max_queries(ROUTES[path]):
+        response = client.get(path)
+    assert response.status_code == 200
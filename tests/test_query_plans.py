@@ -0,0 +1,14 @@
+from sqlalchemy import select
+
+from models import User
+from query_plans import full_scans
+
+
+def test_hot_queries_use_indexes(app):
+    assert full_scans() == {}
+
+
+def test_full_scan_is_reported(app):
+    failures = full_scans({"users by wallet": select(User).filter_by(wallet_number="x")})
+    assert list(failures) == ["users by wallet"]
+
@@ -0,0 +1,90 @@
+from datetime import timedelta
+
+import pytest
+
+import settlement
+from ledger import audit, run_with_retry
+from models import db, DailyEarning, Product, Purchase, SettlementRun, User
+from payouts import StalePayouts, apply_payouts, compute_payouts, utc_today
+from settlement import settle
+
+
+def buy(user_id, count, next_payout_date):
+    product = db.session.scalars(db.select(Product).filter_by(price=50.0)).one()
+    db.session.execute(Purchase.__table__.insert(), [
+        {"user_id": user_id, "product_id": product.id, "remaining_days": 20, "active": True,
+         "next_payout_date": next_payout_date}] * count)
+    db.session.commit()
+
+
+def test_chunks_for_one_user_and_day_add_up_in_the_daily_series(app, user_id):
+    today = utc_today()
+    buy(user_id, 3, today)
+
+    # one purchase per chunk: each chunk upserts the same (user, day) row
+    rows, amount, _ = settle(run_date=today, chunk_size=1, echo=lambda _: None)
+
+    assert (rows, amount) == (3, 30.0)
+    series = db.session.execute(db.select(DailyEarning.day, DailyEarning.amount)).all()
+    assert series == [(today, 30.0)]
+    assert db.session.get(User, user_id).earnings == 30.0
+    assert list(audit()) == []
+
+
+def test_overdue_days_are_caught_up_once(app, user_id):
+    today = utc_today()
+    buy(user_id, 1, today - timedelta(days=2))
+
+    assert settle(run_date=today, echo=lambda _: None)[:2] == (1, 30.0)
+    assert settle(run_date=today, echo=lambda _: None)[:2] == (0, 0.0)
+    days = dict(db.session.execute(db.select(DailyEarning.day, DailyEarning.amount)).all())
+    assert days == {today - timedelta(days=i): 10.0 for i in range(3)}
+    purchase = db.session.scalars(db.select(Purchase)).one()
+    assert (purchase.remaining_days, purchase.next_payout_date) == (17, today + timedelta(days=1))
+
+
+def test_future_dates_are_refused(app):
+    with pytest.raises(ValueError):
+        settle(run_date=utc_today() + timedelta(days=1), echo=lambda _: None)
+
+
+def test_payouts_computed_before_a_concurrent_settle_are_refused(app, user_id):
+    today = utc_today()
+    buy(user_id, 2, today)
+    stale = compute_payouts(today=today)
+    db.session.rollback()
+
+    settle(run_date=today, echo=lambda _: None)  # the other run gets there first
+    paid = db.session.get(User, user_id).balance
+    assert paid == 20.0
+
+    with pytest.raises(StalePayouts):
+        apply_payouts(stale)
+    db.session.rollback()
+
+    db.session.expire_all()
+    assert db.session.get(User, user_id).balance == paid
+    assert list(audit()) == []
+
+
+def test_run_stops_when_another_run_took_its_chunk(app, user_id, monkeypatch):
+    today = utc_today()
+    buy(user_id, 2, today)
+    due_purchase_ids = settlement.due_purchase_ids
+
+    def other_run_commits_first_chunk(**kwargs):
+        ids = due_purchase_ids(**kwargs)
+        if kwargs["after_id"] == 0:
+            runs = SettlementRun.__table__
+            with db.engine.begin() as conn:  # another process, its own connection
+                conn.execute(runs.update().where(runs.c.run_date == today).values(last_purchase_id=ids[0]))
+        return ids
+
+    monkeypatch.setattr(settlement, "due_purchase_ids", other_run_commits_first_chunk)
+    messages = []
+    rows, amount, _ = settle(run_date=today, chunk_size=1, echo=messages.append)
+
+    assert (rows, amount) == (0, 0.0)
+    assert "already settled past purchase #0" in messages[0]
+    assert db.session.get(User, user_id).balance == 0.0
+    assert db.session.scalars(db.select(SettlementRun)).one().finished_at is None